@@ -18,9 +18,10 @@
 from __future__ import print_function, unicode_literals, division
 import pprint
 import idd3
-from idd3 import Relation, Engine
+from idd3 import Engine
 from idd3.rules import en
-import nltk
+from idd3.conll import read_conll
+from itertools import islice
 from sys import argv
 
 import logging
@@ -36,21 +37,17 @@ except ImportError:
 def demo():
     idd3.use_language(en)
 
-    graphs = nltk.parse.dependencygraph.DependencyGraph.load(argv[1])
     index = int(argv[2]) - 1
+    relations = next(islice(read_conll(argv[1]), index, None))
 
     engine = Engine(idd3.all_rulesets, idd3.all_transformations)
 
-    relations = []
-    for relation in graphs[index].nodelist:
-        relations.append(Relation(**relation))
-
     print(colored('Sentence %d:' % (index + 1), 'white', attrs=['bold']))
     pprint.pprint(relations)
 
     print(colored('Propositions:', 'white', attrs=['bold']))
-    engine.analyze(relations)
-    for i, prop in enumerate(engine.props):
+    props = engine.analyze(relations)
+    for i, prop in enumerate(props):
         print(str(i + 1) + ' ' + str(prop))
 
     print(colored('Unprocessed relations:', 'white', attrs=['bold']))
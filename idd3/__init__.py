@@ -15,6 +15,9 @@
 # You should have received a copy of the GNU General Public License along with
 # this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from importlib import import_module
+import sys
+
 from idd3.base import *
 
 
@@ -41,5 +44,18 @@ def use_language(module):
     all_rulesets.extend(module.all_rulesets)
 
 
-from idd3 import rules
-from idd3 import transform
+# The rulesets and transformations take long to import, so they're imported
+#   when first used (e.g., when idd3.rules is accessed).
+_submodules = ('rules', 'transform')
+
+
+def __getattr__(name):
+    if name in _submodules:
+        return import_module('idd3.' + name)
+
+    raise AttributeError("module 'idd3' has no attribute '{0}'".format(name))
+
+
+if sys.version_info < (3, 7):
+    from idd3 import rules
+    from idd3 import transform
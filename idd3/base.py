@@ -17,6 +17,32 @@
 
 from __future__ import print_function, unicode_literals, division
 from importlib import import_module
+import itertools
+import sys
+import threading
+import time
+
+# time.perf_counter doesn't exist in Python 2.
+timer = getattr(time, 'perf_counter', time.time)
+
+# Labels and tags come from small sets, so idd3.conll interns them, which
+#   keeps a single copy of each in memory. (It doesn't make comparing them
+#   measurably faster.)
+try:
+    intern = sys.intern
+except AttributeError:
+    # Python 2 only interns byte strings, and io.open returns unicode, which
+    #   is then kept as it is.
+    _intern = intern
+
+    def intern(string):
+        return _intern(string) if isinstance(string, bytes) else string
+
+try:
+    string_types = basestring
+    text_type = unicode
+except NameError:
+    string_types = text_type = str
 
 import logging
 logger = logging.getLogger(__name__)
@@ -25,6 +51,15 @@ logger = logging.getLogger(__name__)
 class Relation(object):
     """Represents a relation in the dependency tree."""
 
+    # 'processed' is set by the Engine during the analysis. '_children' is
+    #   an index mapping relation labels to the indices of this relation's
+    #   children, built by build_children_index; None means there is no
+    #   valid index, and queries fall back to scanning deps. The Engine
+    #   only keeps the index while its rulesets run, after the
+    #   transformations.
+    __slots__ = ('address', 'deps', 'head', 'rel', 'tag', 'ctag', 'word',
+                 'lemma', 'feats', 'processed', '_children')
+
     def __init__(self, **kwargs):
         """Form a relation.
 
@@ -50,6 +85,7 @@ class Relation(object):
         self.word = kwargs['word']
         self.lemma = kwargs['lemma']
         self.feats = kwargs['feats']
+        self._children = None
 
     @staticmethod
     def get_children_with_dep(rel, relations, index):
@@ -66,17 +102,53 @@ class Relation(object):
             otherwise.
 
         """
+        children = relations[index]._children
+        if children is not None:
+            return list(children.get(rel, ()))
+
         return [child_index for child_index in relations[index].deps
                 if relations[child_index].rel == rel
                 and relations[child_index].head == index]
 
+    @staticmethod
+    def build_children_index(relations):
+        """Build, for every relation in a sentence, an index mapping labels
+            to the indices of its children, so that get_children_with_dep
+            no longer needs to scan deps. The index must be cleared (see
+            clear_children_index) before the tree is changed.
+
+        :relations: all the relations of the sentence.
+        """
+        for relation in relations:
+            relation._children = {}
+
+        for index, relation in enumerate(relations):
+            children = relation._children
+            for child_index in relation.deps:
+                child = relations[child_index]
+                if child.head == index:
+                    if child.rel in children:
+                        children[child.rel].append(child_index)
+                    else:
+                        children[child.rel] = [child_index]
+
+    @staticmethod
+    def clear_children_index(relations):
+        """Invalidate the children index of every relation in a sentence.
+
+        :relations: all the relations of the sentence.
+        """
+        for relation in relations:
+            relation._children = None
+
     def __repr__(self):
-        keys = sorted(self.__dict__)
+        keys = sorted(key for key in self.__slots__
+                      if not key.startswith('_') and hasattr(self, key))
 
         string = '{'
         for k, key in enumerate(keys):
             string += '{key}: {value}'.format(key=key,
-                                              value=self.__dict__[key])
+                                              value=getattr(self, key))
             if k != len(keys) - 1:
                 string += ', '
         string += '}'
@@ -88,16 +160,22 @@ class Proposition(object):
 
     """Represents a proposition, with its content and kind."""
 
-    def __init__(self, content, kind):
+    __slots__ = ('content', 'kind', 'index')
+
+    def __init__(self, content, kind, index=None):
         """Form a proposition
 
         :content: the content of the proposition. E.g.: (ran, the cat).
         :kind: the kind of the proposition. E.g., P (predication),
         M (modification), C (connection), and so on.
+        :index: the index of the relation whose ruleset emitted the
+            proposition (e.g., that of 'ran'), which aligns it to the
+            sentence without searching for its words.
 
         """
         self.content = content
         self.kind = kind
+        self.index = index
 
     def __repr__(self):
         _prop = []
@@ -111,9 +189,105 @@ class Proposition(object):
         return '{0} [{1}]'.format(content, self.kind)
 
 
+class Context(object):
+
+    """The path from the TOP relation to the one being analyzed, stored as a
+        linked list of indices that starts at the current relation. Paths
+        are never changed: descending into a child creates a single node
+        that shares the path of its parent, instead of copying it. For
+        compatibility, contexts behave like (read-only) lists of indices.
+    """
+
+    __slots__ = ('index', 'parent', 'depth')
+
+    def __init__(self, index=None, parent=None):
+        """Form a context. Without arguments, form the empty path.
+
+        :index: the index of the last relation in the path.
+        :parent: the context of the relation before it.
+        """
+        self.index = index
+        self.parent = parent
+        self.depth = 0 if parent is None else parent.depth + 1
+
+    @staticmethod
+    def from_path(path):
+        """Form a context from a list of indices, starting at TOP."""
+        context = Context()
+        for index in path:
+            context = Context(index, context)
+        return context
+
+    def descend(self, index):
+        """Return the context of a child of the current relation.
+
+        :index: the index of the child.
+        """
+        return Context(index, self)
+
+    def path(self):
+        """Return the list of indices, starting at TOP."""
+        path = []
+        context = self
+        while context.parent is not None:
+            path.append(context.index)
+            context = context.parent
+        path.reverse()
+        return path
+
+    def __len__(self):
+        return self.depth
+
+    def __iter__(self):
+        return iter(self.path())
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.path()[i]
+
+        if i >= 0:
+            i -= self.depth
+        if not -self.depth <= i < 0:
+            raise IndexError('context index out of range')
+
+        context = self
+        for _ in range(-i - 1):
+            context = context.parent
+        return context.index
+
+    def __add__(self, indices):
+        context = self
+        for index in indices:
+            context = Context(index, context)
+        return context
+
+    def __eq__(self, other):
+        return self.path() == list(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self.path())
+
+
 class Transformation(object):
     """Transforms a given dependency tree to facilitate its processing."""
 
+    # Lowercased words, PoS-tags and relation labels of the positions where
+    #   this transformation may change the tree. They are used by
+    #   FusedTransformation to find the positions worth checking with
+    #   matches; None in all three means any position may change.
+    trigger_words = None
+    trigger_tags = None
+    trigger_rels = None
+
+    # Whether transform renumbers the tree (rebuilding addresses and deps
+    #   from the heads) even when it changes nothing else.
+    normalizes = False
+
     def transform(self, relations):
         """Apply the corresponding transformation in place.
 
@@ -121,6 +295,17 @@ class Transformation(object):
         """
         raise "Don't instantiate Transformation. Use a subclass instead."
 
+    def matches(self, relations, index):
+        """Check whether this transformation may change the tree at a given
+            position. It must return True wherever transform would change
+            something (or fail), and must not depend on addresses or deps.
+
+        :relations: the list of relations in a sentence.
+        :index: the index of the relation to check.
+        :returns: False if transform leaves this position untouched.
+        """
+        return True
+
 
 class Ruleset(object):
     """A ruleset is responsible for processing relations of a certain label."""
@@ -139,8 +324,8 @@ class Ruleset(object):
 
         :relations: the list of relations in a sentence.
         :index: the index of the relation to be processed.
-        :context: a list of indices representing the path from the TOP node
-            to the current one.
+        :context: a Context representing the path from the TOP node to the
+            current one.
         :engine: the engine that is running the analysis process.
         :info: a dictionary containing already parsed contextual information.
         :returns: a string representation that can be embedded in other
@@ -154,43 +339,156 @@ class Engine(object):
     """An engine is responsible for running the analysis process, by calling the
         right rulesets and collecting the emitted propositions."""
 
-    def __init__(self, rulesets, transformations=[]):
+    # The attributes of a relation, in the order they're stored in the
+    #   analysis cache.
+    _state_fields = ('address', 'deps', 'head', 'rel', 'tag', 'ctag', 'word',
+                     'lemma', 'feats', 'processed')
+
+    # Rulesets call analyze for every child, so each level of the tree
+    #   costs a few Python frames (up to about 8, as measured on chains of
+    #   prepositional phrases, clauses and conjunctions). Deep mode budgets
+    #   frames_per_level frames and bytes_per_frame bytes of thread stack
+    #   for each level.
+    frames_per_level = 12
+    bytes_per_frame = 4096
+
+    # Serializes the changes deep analyses make to the recursion limit and
+    #   to the stack size of new threads, and counts the deep analyses
+    #   running, with the recursion limit from before the first of them.
+    _deep_lock = threading.Lock()
+    _deep_analyses = 0
+    _recursion_limit = None
+
+    def __init__(self, rulesets, transformations=[], cache=None, deep=False,
+                 profiler=None, tracer=None, language=None,
+                 count_only=False, sink=None):
         """Form an engine.
 
         :rulesets: a list of the rulesets to be used.
         :transformations: a list of transformations to be applied to the
             sentences prior to processing.
+        :cache: an idd3.cache.AnalysisCache. If given, sentences identical
+            to ones already analyzed (with the same rulesets and
+            transformations) are not analyzed again.
+        :deep: if True, sentences too deep for the interpreter's recursion
+            limit are analyzed in a separate thread, with a stack and a
+            recursion limit large enough for their depth. This changes
+            process-wide settings while they run (see _analyze_in_thread).
+        :profiler: an idd3.profiling.Profiler, to which the time spent in
+            each ruleset and transformation is reported.
+        :tracer: an idd3.tracing.Tracer, to which the tree, ruleset calls
+            and propositions of each sentence are reported.
+        :language: a LanguagePack, whose configuration the rulesets use
+            instead of the global one (idd3.config). See for_language.
+        :count_only: if True, analyze only counts the propositions of each
+            kind, returning a dictionary that maps kinds to counts, instead
+            of the list of propositions. Tracers then get no propositions.
+        :sink: an idd3.sinks.Sink, to which each proposition is passed as
+            soon as it's emitted.
+
+        The state of each analysis is kept in an Analysis, so an engine can
+            analyze sentences in several threads at once, as long as it has
+            no profiler or tracer (which are not thread-safe).
         """
         self.rulesets = rulesets
         self.transformations = transformations
+        self.cache = cache
+        self.deep = deep
+        self.profiler = profiler
+        self.tracer = tracer
+        self.language = language
+        self.count_only = count_only
+        self.sink = sink
+        # The IDs of the sentences, passed to the sink.
+        self._sentence_ids = itertools.count()
+        self._analysis_class = CountingAnalysis if count_only else Analysis
+
+        # Without a profiler or a tracer, rulesets are called with no extra
+        #   cost.
+        if profiler is not None or tracer is not None:
+            self._extract = self._instrumented_extract
+        self._rulesets = ()
+        self._rulesets_dict = {}
+        if language is not None and tuple(rulesets) == language.rulesets:
+            self._rulesets = language.rulesets
+            self._rulesets_dict = dict(language.dispatch)
+        # The result of the last sentence analyzed by each thread.
+        self._local = threading.local()
+
+    @classmethod
+    def for_language(cls, language, **kwargs):
+        """Form an engine with the rulesets, transformations and
+            configuration of a language, independent of idd3.use_language.
+
+        :language: a LanguagePack, a language module (e.g., idd3.rules.en),
+            or its name.
+        :kwargs: the other arguments of __init__.
+        """
+        if not isinstance(language, LanguagePack):
+            language = LanguagePack.from_module(language)
+
+        return cls(language.rulesets, language.transformations,
+                   language=language, **kwargs)
+
+    @property
+    def config(self):
+        """The configuration the rulesets use: that of the engine's
+            LanguagePack, or else the global one."""
+        if self.language is not None:
+            return self.language.config
+
+        import idd3
+        return idd3.config
+
+    @property
+    def props(self):
+        """The propositions of the last sentence analyzed in the current
+            thread, or their counts in count-only mode (analyze returns them
+            as well)."""
+        return getattr(self._local, 'props', [])
+
+    def _find_ruleset(self, rel):
+        """Find the first ruleset that applies to a relation label.
+
+        :rel: the relation label.
+        :returns: the ruleset instance, or None if no ruleset applies.
+        """
+        for ruleset in self.rulesets:
+            if ruleset.applies(rel):
+                return ruleset
+
+        return None
 
     def _build_rulesets_dict(self, relations):
-        """Create a dictionary associating relation labels to their
-            corresponding ruleset instance.
+        """Update the dictionary associating relation labels to their
+            corresponding ruleset instance with the labels of a sentence.
+            The dictionary is kept across sentences, and is only rebuilt
+            from scratch when the list of rulesets changes. It's never
+            changed in place, but replaced by an updated copy, so other
+            threads can keep using the one they have.
 
         :relations: the list of relations in a sentence.
+        :returns: the dictionary.
         """
-        self._rulesets_dict = {}
+        rulesets = tuple(self.rulesets)
+        rulesets_dict = self._rulesets_dict
+        if rulesets != self._rulesets:
+            rulesets_dict = {}
+
+        missing = [relation.rel for relation in relations
+                   if relation.rel not in rulesets_dict]
+        if missing or rulesets != self._rulesets:
+            rulesets_dict = dict(rulesets_dict)
+            for rel in missing:
+                rulesets_dict[rel] = self._find_ruleset(rel)
+            self._rulesets_dict = rulesets_dict
+            self._rulesets = rulesets
 
         for relation in relations:
-            ruleset = None
-            for _ruleset in self.rulesets:
-                if _ruleset.applies(relation.rel):
-                    ruleset = _ruleset
-                    break
-            if ruleset is None:
+            if rulesets_dict[relation.rel] is None:
                 logger.warning('Unrecognized relation %s.', relation.rel)
 
-            self._rulesets_dict[relation.rel] = ruleset
-
-    def emit(self, prop, kind='PROP'):
-        """Emit a new proposition, storing it in this instance's
-            'props' attribute.
-
-        :prop: the proposition to be emitted.
-        """
-        self.props.append(Proposition(prop, kind))
-        return len(self.props)
+        return rulesets_dict
 
     @staticmethod
     def mark_processed(relations, index):
@@ -201,47 +499,463 @@ class Engine(object):
         """
         relations[index].processed = True
 
-    def analyze(self, relations, index=0, context=[], info={}):
+    def analyze(self, relations, index=0, context=None, info=None):
         """Analyze a sentence, using this instance's ruleset set.
 
-        :relations: the relations in a sentence.
+        :relations: the relations in a sentence, or an
+            idd3.columnar.ColumnarSentence.
         :index: the index of the relation to be analyzed.
-        :context: the path from the TOP relation to the current one.
+        :context: the path from the TOP relation to the current one, as a
+            Context (or a list of indices).
         :info: a dictionary containing already parsed contextual information.
-        :returns: the return value of the corresponding ruleset's extract
-            method.
+        :returns: for the TOP relation, the list of propositions extracted
+            from the sentence (or their counts, in count-only mode); for
+            others, the return value of the
+            corresponding ruleset's extract method.
+        """
+        # Rulesets may add entries to info, so it cannot be shared between
+        #   calls (and, in particular, between sentences).
+        if info is None:
+            info = {}
+
+        # Transformations change the tree, so an idd3.columnar
+        #   ColumnarSentence is analyzed through its Relations.
+        to_relations = getattr(relations, 'to_relations', None)
+        if to_relations is not None:
+            relations = to_relations()
+
+        if context is None:
+            context = Context()
+        elif context.__class__ is not Context:
+            context = Context.from_path(context)
+
+        if relations[index].rel != 'TOP':
+            analysis = self._analysis_class(
+                self, self._build_rulesets_dict(relations))
+            return self._extract(analysis, relations, index, context, info)
+
+        props = None
+        if self.deep:
+            frames = self.frames_per_level * (self.tree_depth(relations) + 1)
+            if frames > sys.getrecursionlimit() // 2:
+                props = self._analyze_in_thread(relations, index, context,
+                                                info, frames)
+        if props is None:
+            props = self._analyze_top(relations, index, context, info)
+
+        self._local.props = props
+        return props
+
+    @staticmethod
+    def tree_depth(relations):
+        """Compute the depth of a dependency tree, without recursion.
+
+        :relations: the relations in a sentence.
+        :returns: the number of relations in the longest path from the TOP
+            relation to a leaf, not counting TOP.
+        """
+        depths = [0] * len(relations)
+
+        for index in range(1, len(relations)):
+            path = []
+            current = index
+            while current and not depths[current]:
+                path.append(current)
+                if len(path) > len(relations):
+                    raise ValueError('The heads of the sentence form a cycle.')
+                current = relations[current].head
+
+            depth = depths[current]
+            for current in reversed(path):
+                depth += 1
+                depths[current] = depth
+
+        return max(depths)
+
+    def _analyze_in_thread(self, relations, index, context, info, frames):
+        """Analyze a sentence in a new thread, whose stack and recursion
+            limit are large enough for a given number of frames.
+
+        Both settings are global to the process:
+        - the recursion limit (sys.setrecursionlimit) is shared by all
+          threads, so while any deep analysis runs, other code may recurse
+          that deep too, on stacks that may be too small for it. It's
+          restored once the last deep analysis is done;
+        - the stack size of new threads (threading.stack_size) is raised
+          just while the analysis thread starts, under _deep_lock, but
+          threads other code starts at that moment get it too.
+        If the calling thread is interrupted while it waits (e.g., by
+            KeyboardInterrupt), the analysis thread still runs to its end,
+            and the settings are restored after it.
+
+        The analysis isn't run with an explicit work stack instead because
+            rulesets call Engine.analyze for their children and use the
+            result right away, so all of them (and their helpers) would
+            have to be rewritten as generators, which Python 2 can't
+            delegate to (there's no yield from).
+        """
+        outcome = {}
+
+        def done():
+            with Engine._deep_lock:
+                Engine._deep_analyses -= 1
+                if not Engine._deep_analyses:
+                    sys.setrecursionlimit(Engine._recursion_limit)
+
+        def run():
+            try:
+                outcome['value'] = self._analyze_top(relations, index,
+                                                     context, info)
+            except BaseException as e:
+                outcome['error'] = e
+            finally:
+                done()
+
+        with Engine._deep_lock:
+            if not Engine._deep_analyses:
+                Engine._recursion_limit = sys.getrecursionlimit()
+            Engine._deep_analyses += 1
+            if sys.getrecursionlimit() < 2 * frames:
+                sys.setrecursionlimit(2 * frames)
+
+            stack_size = threading.stack_size()
+            threading.stack_size(max(stack_size,
+                                     2 * frames * self.bytes_per_frame))
+            try:
+                thread = threading.Thread(target=run)
+                thread.start()
+            except BaseException:
+                # The thread never ran, so done won't undo the count.
+                Engine._deep_analyses -= 1
+                if not Engine._deep_analyses:
+                    sys.setrecursionlimit(Engine._recursion_limit)
+                raise
+            finally:
+                threading.stack_size(stack_size)
+
+        thread.join()
+
+        if 'error' in outcome:
+            raise outcome['error']
+
+        return outcome['value']
+
+    def _analyze_top(self, relations, index, context, info):
+        """Analyze a sentence from its TOP relation.
+
+        :returns: the result of the Analysis.
+        """
+        analysis = self._analysis_class(self)
+        if self.tracer is not None:
+            analysis.trace = self.tracer.begin()
+        if self.sink is not None:
+            analysis.sentence_id = next(self._sentence_ids)
+
+        try:
+            if self.cache is not None:
+                self._analyze_cached(analysis, relations, index, context,
+                                     info)
+            else:
+                self._prepare(analysis, relations)
+                self._extract(analysis, relations, index, context, info)
+        except BaseException as error:
+            # The sink got only part of the sentence's propositions.
+            if self.sink is not None:
+                self.sink.abort_sentence(analysis.sentence_id, error)
+            raise
+        finally:
+            # The children index is only valid until the tree changes, and
+            #   the relations may be transformed again after the analysis.
+            Relation.clear_children_index(relations)
+
+        if analysis.trace is not None:
+            self.tracer.end(analysis.trace, relations, analysis.props)
+        if self.sink is not None:
+            self.sink.end_sentence(analysis.sentence_id)
+
+        return analysis.result()
+
+    def _prepare(self, analysis, relations):
+        """Clear results from previous executions, apply transformations,
+            and prepare for starting.
+
+        :analysis: the Analysis of the sentence.
+        :relations: the relations in a sentence.
         """
-        # Clear results from previous executions, apply transformations,
-        #   and prepare for starting.
-        if relations[index].rel == 'TOP':
+        # Transformations change the tree freely, so the children index
+        #   is only built once they are done.
+        Relation.clear_children_index(relations)
+        if self.profiler is None:
             for transformation in self.transformations:
                 transformation.transform(relations)
+        else:
+            for transformation in self.transformations:
+                start = timer()
+                transformation.transform(relations)
+                self.profiler.add_transformation(
+                    transformation.__class__.__name__, timer() - start)
+        Relation.build_children_index(relations)
 
+        if logger.isEnabledFor(logging.DEBUG):
             from pprint import pformat
             logger.debug('After transformations:\n%s', pformat(relations))
+        if analysis.trace is not None:
+            analysis.trace['tree'] = self.tracer.tree(relations)
 
-            self.props = []
-            for relation in relations:
-                relation.processed = False
-            self._build_rulesets_dict(relations)
+        for relation in relations:
+            relation.processed = False
+        analysis.rulesets_dict = self._build_rulesets_dict(relations)
 
-        logger.debug('Will call ruleset %s from caller %d',
-                     self._rulesets_dict[relations[index].rel]
-                     .__class__.__name__,
-                     context[-1] if len(context) > 0 else -1)
+    @staticmethod
+    def _extract(analysis, relations, index, context, info):
+        """Call the ruleset of a relation, and mark it as processed."""
+        ruleset = analysis.rulesets_dict[relations[index].rel]
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('Will call ruleset %s from caller %d',
+                         ruleset.__class__.__name__,
+                         context.index if context.depth > 0 else -1)
 
-        value = self._rulesets_dict[relations[index].rel]\
-            .extract(relations, index, context, self, info)
+        # Propositions emitted by the ruleset refer to the relation.
+        caller_index = analysis.index
+        analysis.index = index
+        value = ruleset.extract(relations, index, context, analysis, info)
+        analysis.index = caller_index
 
-        self.mark_processed(relations, index)
+        relations[index].processed = True
 
         return value
 
+    def _instrumented_extract(self, analysis, relations, index, context,
+                              info):
+        """Like _extract, reporting the call to the tracer and the time spent
+            to the profiler."""
+        name = analysis.rulesets_dict[relations[index].rel].__class__.__name__
+
+        if analysis.trace is not None:
+            analysis.trace['dispatch'].append(
+                [index, relations[index].rel, name,
+                 context.index if context.depth > 0 else -1])
+
+        if self.profiler is None:
+            return Engine._extract(analysis, relations, index, context, info)
+
+        self.profiler.enter(name)
+        try:
+            return Engine._extract(analysis, relations, index, context, info)
+        finally:
+            self.profiler.exit()
+
+    def _cache_key(self, relations):
+        """Compute the analysis cache key of a sentence, before it's
+            transformed. The key includes the rulesets, transformations and
+            configuration in use, since they depend on the language."""
+        return (id(self.config), self.count_only,
+                tuple(id(ruleset) for ruleset in self.rulesets),
+                tuple(id(transformation)
+                      for transformation in self.transformations),
+                tuple((relation.word, relation.lemma, relation.ctag,
+                       relation.tag, relation.feats, relation.head,
+                       relation.rel, tuple(relation.deps))
+                      for relation in relations))
+
+    def _analyze_cached(self, analysis, relations, index, context, info):
+        """Analyze a sentence, or restore its state after the analysis from
+            the cache. As transformations change the relations in place, the
+            cache stores the transformed relations, and not only the
+            propositions.
+        """
+        key = self._cache_key(relations)
+        entry = self.cache.get(key)
+
+        if entry is None:
+            self._prepare(analysis, relations)
+            self._extract(analysis, relations, index, context, info)
+
+            state = tuple((relation.address, tuple(relation.deps)) +
+                          tuple(getattr(relation, field)
+                                for field in self._state_fields[2:])
+                          for relation in relations)
+            self.cache.put(key, (state, analysis.freeze()))
+            return
+
+        state, result = entry
+
+        restored = []
+        for values in state:
+            relation = Relation.__new__(Relation)
+            for field, field_value in zip(self._state_fields, values):
+                setattr(relation, field, field_value)
+            relation.deps = list(relation.deps)
+            relation._children = None
+            restored.append(relation)
+        relations[:] = restored
+        Relation.build_children_index(relations)
+
+        analysis.thaw(result)
+        if self.sink is not None:
+            analysis.replay()
+        analysis.rulesets_dict = self._build_rulesets_dict(relations)
+        if analysis.trace is not None:
+            analysis.trace['cached'] = True
+
+    def analyze_many(self, sentences):
+        """Analyze several sentences, one after the other, reusing the
+            label-to-ruleset dispatch table built for the previous ones.
+
+        :sentences: an iterable of relation lists, one for each sentence.
+        :returns: a generator that yields, for each sentence, the list of
+            propositions extracted from it.
+        """
+        for relations in sentences:
+            yield self.analyze(relations)
+
     @staticmethod
     def get_unprocessed_relations(relations):
         return [relation for relation in relations if not relation.processed]
 
 
+class Analysis(object):
+
+    """The state of the analysis of a sentence by an Engine. It's what
+        rulesets get as their 'engine' argument: they call its analyze
+        method to process other relations, its emit method to emit
+        propositions, and read the language's parameters from its 'config'
+        attribute.
+    """
+
+    def __init__(self, engine, rulesets_dict=None):
+        """Form an analysis.
+
+        :engine: the Engine running it.
+        :rulesets_dict: the dictionary associating relation labels to
+            their ruleset instance (see Engine._build_rulesets_dict).
+        """
+        self.engine = engine
+        self.config = engine.config
+        self.rulesets_dict = rulesets_dict
+        self.props = []
+        # The trace of the sentence, if it's being traced.
+        self.trace = None
+        # The engine's sink, and the ID of the sentence it gets.
+        self.sink = engine.sink
+        self.sentence_id = None
+        # The index of the relation whose ruleset is running.
+        self.index = None
+
+    def analyze(self, relations, index, context, info=None):
+        """Analyze a relation of the sentence (see Engine.analyze).
+
+        :returns: the return value of the corresponding ruleset's extract
+            method.
+        """
+        if info is None:
+            info = {}
+
+        return self.engine._extract(self, relations, index, context, info)
+
+    def emit(self, prop, kind='PROP'):
+        """Emit a new proposition, storing it in this instance's
+            'props' attribute.
+
+        :prop: the proposition to be emitted.
+        :returns: the ID of the proposition (its position in 'props',
+            starting at 1).
+        """
+        proposition = Proposition(prop, kind, self.index)
+        self.props.append(proposition)
+        if self.sink is not None:
+            self.sink.emit(self.sentence_id, proposition)
+        return len(self.props)
+
+    def result(self):
+        """Return the result of the analysis: the list of propositions."""
+        return self.props
+
+    def freeze(self):
+        """Return the result in an immutable form, to be cached."""
+        return tuple((prop.content, prop.kind, prop.index)
+                     for prop in self.props)
+
+    def thaw(self, frozen):
+        """Restore a result returned by freeze."""
+        self.props = [Proposition(content, kind, index)
+                      for content, kind, index in frozen]
+
+    def replay(self):
+        """Pass the propositions of a restored result to the sink."""
+        for proposition in self.props:
+            self.sink.emit(self.sentence_id, proposition)
+
+    @staticmethod
+    def join_words(words, separator=' '):
+        """Join words that only make up the content of propositions, which
+            count-only analyses skip (see CountingAnalysis.join_words)."""
+        return separator.join(words)
+
+    mark_processed = staticmethod(Engine.mark_processed)
+    get_unprocessed_relations = staticmethod(Engine.get_unprocessed_relations)
+
+
+class CountingAnalysis(Analysis):
+
+    """An Analysis that only counts the propositions of each kind, without
+        storing them (see Engine.__init__)."""
+
+    def __init__(self, engine, rulesets_dict=None):
+        Analysis.__init__(self, engine, rulesets_dict)
+        self.counts = {}
+        self.total = 0
+        # The kind and relation index of each proposition, in the order
+        #   they were emitted, so that a cached result can be replayed to
+        #   the sink as it was first emitted. They are only kept if there
+        #   is a cache to store them.
+        self.events = [] if engine.cache is not None else None
+
+    def emit(self, prop, kind='PROP'):
+        """Count a new proposition.
+
+        :prop: the proposition (ignored).
+        :returns: the ID the proposition would have in a full analysis.
+        """
+        counts = self.counts
+        counts[kind] = counts.get(kind, 0) + 1
+        self.total += 1
+        if self.events is not None:
+            self.events.append((kind, self.index))
+        if self.sink is not None:
+            self.sink.emit(self.sentence_id,
+                           Proposition(None, kind, self.index))
+        return self.total
+
+    def result(self):
+        """Return the result of the analysis: a dictionary that maps kinds to
+            the number of propositions of that kind."""
+        return self.counts
+
+    def freeze(self):
+        return tuple(self.events)
+
+    def thaw(self, frozen):
+        self.events = list(frozen)
+        self.counts = {}
+        for kind, index in self.events:
+            self.counts[kind] = self.counts.get(kind, 0) + 1
+        self.total = len(self.events)
+
+    def replay(self):
+        for kind, index in self.events:
+            self.sink.emit(self.sentence_id, Proposition(None, kind, index))
+
+    @staticmethod
+    def join_words(words, separator=' '):
+        """Skip joining words for the content of a proposition, which isn't
+            kept (see Analysis.join_words).
+
+        :returns: None.
+        """
+        return None
+
+
 class Config(dict):
 
     """A class for storing configuration parameters. """
@@ -255,4 +969,95 @@ class Config(dict):
 
         for var in dir(m):
             if var.isupper():
-                self[var] = getattr(m, var)
\ No newline at end of file
+                value = getattr(m, var)
+                # Parameters are only used in membership tests.
+                if isinstance(value, (tuple, list)):
+                    value = frozenset(value)
+                self[var] = value
+
+
+class FrozenConfig(Config):
+
+    """A Config that can't be changed."""
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError('This configuration is read-only.')
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = \
+        update = from_object = _read_only
+
+    def __reduce__(self):
+        return (self.__class__, (dict(self),))
+
+
+class LanguagePack(object):
+
+    """The configuration, transformations and rulesets of a language, bound
+        to an Engine (see Engine.for_language) instead of installed globally
+        with idd3.use_language. Language packs can't be changed, so engines
+        for different languages can run side by side.
+
+        A pack also holds the dispatch table of its rulesets, which engines
+        formed from it start with.
+    """
+
+    __slots__ = ('name', 'config', 'transformations', 'rulesets', 'dispatch')
+
+    def __init__(self, name, config, transformations, rulesets):
+        """Form a language pack.
+
+        :name: the name of the language module.
+        :config: a mapping of configuration parameters.
+        :transformations: a sequence of transformations.
+        :rulesets: a sequence of rulesets.
+        """
+        rulesets = tuple(rulesets)
+        # The labels of the rulesets are dispatched like Engine._find_ruleset
+        #   does, to the first ruleset that applies to them; other labels
+        #   are added by the engines as they come up.
+        dispatch = {}
+        for label in [getattr(ruleset, 'rel', None) for ruleset in rulesets]:
+            if label is None or label in dispatch:
+                continue
+            for ruleset in rulesets:
+                if ruleset.applies(label):
+                    dispatch[label] = ruleset
+                    break
+            else:
+                dispatch[label] = None
+
+        # Parameters are only used in membership tests (see
+        #   Config.from_object).
+        frozen = {}
+        for key, value in config.items():
+            if isinstance(value, (tuple, list)):
+                value = frozenset(value)
+            frozen[key] = value
+
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, 'config', FrozenConfig(frozen))
+        object.__setattr__(self, 'transformations', tuple(transformations))
+        object.__setattr__(self, 'rulesets', rulesets)
+        object.__setattr__(self, 'dispatch', dispatch)
+
+    @classmethod
+    def from_module(cls, module):
+        """Form a language pack from a language module.
+
+        :module: the module (e.g., idd3.rules.en), or its name.
+        """
+        if isinstance(module, string_types):
+            module = import_module(module)
+
+        return cls(module.__name__, module.config,
+                   module.all_transformations, module.all_rulesets)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Language packs are immutable.')
+
+    def __reduce__(self):
+        return (self.__class__, (self.name, dict(self.config),
+                                 self.transformations, self.rulesets))
+
+    def __repr__(self):
+        return 'LanguagePack({0!r})'.format(self.name)
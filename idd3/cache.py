@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+# IDD3 - Propositional Idea Density from Dependency Trees
+# Copyright (C) 2014-2015  Andre Luiz Verucci da Cunha
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import print_function, unicode_literals, division
+from collections import OrderedDict
+import hashlib
+import os
+import tempfile
+import threading
+import zlib
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class ParseCache(object):
+
+    """An on-disk cache of normalized dependency trees, keyed by a hash of
+        the sentence and of the parser that produced them. Each tree is
+        stored zlib-compressed in its own file; when the cache grows past
+        its size limit, the least recently used trees are removed."""
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024):
+        """Form a cache.
+
+        :directory: the directory where trees are stored (created if it
+            doesn't exist).
+        :max_bytes: the maximum total size of the stored trees.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self.size = sum(os.path.getsize(path) for path in self._entries())
+
+    @staticmethod
+    def key(parser_id, sentence):
+        """Compute the key of a sentence.
+
+        :parser_id: a string identifying the parser and its model.
+        :sentence: the sentence, as a string.
+        """
+        text = parser_id + '\0' + ' '.join(sentence.split())
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def _entries(self):
+        for subdirectory in os.listdir(self.directory):
+            subdirectory = os.path.join(self.directory, subdirectory)
+            if os.path.isdir(subdirectory):
+                for name in os.listdir(subdirectory):
+                    yield os.path.join(subdirectory, name)
+
+    def get(self, key):
+        """Look a tree up.
+
+        :key: the key of the sentence (see ParseCache.key).
+        :returns: the normalized CoNLL lines of the tree, or None if it's
+            not in the cache.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as entry:
+                data = entry.read()
+            # Mark the entry as recently used.
+            os.utime(path, None)
+            text = zlib.decompress(data).decode('utf-8')
+        except (IOError, OSError, zlib.error, UnicodeDecodeError):
+            # A missing or corrupt entry; the tree is parsed (and stored)
+            #   again.
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return [line + '\n' for line in text.split('\n')]
+
+    def put(self, key, lines):
+        """Store a tree.
+
+        :key: the key of the sentence (see ParseCache.key).
+        :lines: the normalized CoNLL lines of the tree.
+        """
+        text = '\n'.join(line.rstrip('\n') for line in lines)
+        data = zlib.compress(text.encode('utf-8'))
+
+        path = self._path(key)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+
+        # Write to a temporary file first, so that concurrent readers never
+        #   see a partial entry.
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as entry:
+            entry.write(data)
+        os.rename(temp_path, path)
+
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Remove the least recently used trees until the cache is 10% below
+            its size limit."""
+        entries = []
+        for path in self._entries():
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        self.size = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+
+        for _, size, path in entries:
+            if self.size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                logger.warning('Could not remove %s from the parse cache.',
+                               path)
+                continue
+            self.size -= size
+
+    def stats(self):
+        """Return a dictionary with the number of hits and misses, the hit
+            rate, and the total size of the stored trees."""
+        lookups = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'size': self.size}
+
+
+class AnalysisCache(object):
+
+    """An in-memory LRU cache of analysis results, used by the Engine to skip
+        sentences it has already analyzed (see Engine.__init__)."""
+
+    def __init__(self, maxsize=1024):
+        """Form a cache.
+
+        :maxsize: the maximum number of stored results.
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # Engines may be shared between threads.
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Look a result up, marking it as recently used.
+
+        :key: the key of the sentence.
+        :returns: the stored result, or None if it's not in the cache.
+        """
+        with self._lock:
+            try:
+                value = self._entries.pop(key)
+            except KeyError:
+                self.misses += 1
+                return None
+
+            self._entries[key] = value
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store a result, evicting the least recently used one if the cache
+            is full.
+
+        :key: the key of the sentence.
+        :value: the result.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all the stored results."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return a dictionary with the number of hits and misses, the hit
+            rate, and the number of stored results."""
+        lookups = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'size': len(self._entries)}
@@ -0,0 +1,385 @@
+# -*- coding: utf-8 -*-
+# IDD3 - Propositional Idea Density from Dependency Trees
+# Copyright (C) 2014-2015  Andre Luiz Verucci da Cunha
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import print_function, unicode_literals, division
+from array import array
+import struct
+import sys
+
+from idd3.base import Relation
+
+# Python 2 names them tostring and fromstring.
+_tobytes = getattr(array, 'tobytes', None) or array.tostring
+_frombytes = getattr(array, 'frombytes', None) or array.fromstring
+
+
+class Vocabulary(object):
+
+    """Maps strings to integer IDs and back. ID 0 always stands for None."""
+
+    def __init__(self, strings=()):
+        """Form a vocabulary.
+
+        :strings: strings to add, in order.
+        """
+        self.strings = [None]
+        self.ids = {None: 0}
+        for string in strings:
+            self.id(string)
+
+    def __len__(self):
+        return len(self.strings)
+
+    def id(self, string):
+        """Return the ID of a string, adding it if needed."""
+        try:
+            return self.ids[string]
+        except KeyError:
+            self.ids[string] = len(self.strings)
+            self.strings.append(string)
+            return self.ids[string]
+
+    def string(self, string_id):
+        """Return the string of an ID."""
+        return self.strings[string_id]
+
+
+class RelationView(object):
+
+    """A view of a relation in a ColumnarSentence, with the same attributes
+        as a Relation. Only 'processed' can be changed: the Engine analyzes
+        ColumnarSentences through their Relations (see
+        ColumnarSentence.to_relations), since transformations change the
+        tree."""
+
+    __slots__ = ('sentence', 'address')
+
+    def __init__(self, sentence, address):
+        self.sentence = sentence
+        self.address = address
+
+    @property
+    def head(self):
+        head = self.sentence.heads[self.address]
+        return None if head < 0 else head
+
+    @property
+    def deps(self):
+        return list(self.sentence.children_of(self.address))
+
+    def _string(self, column):
+        return self.sentence.vocabulary.strings[column[self.address]]
+
+    rel = property(lambda self: self._string(self.sentence.labels))
+    tag = property(lambda self: self._string(self.sentence.tags))
+    ctag = property(lambda self: self._string(self.sentence.ctags))
+    word = property(lambda self: self._string(self.sentence.words))
+    lemma = property(lambda self: self._string(self.sentence.lemmas))
+    feats = property(lambda self: self._string(self.sentence.feats))
+
+    @property
+    def processed(self):
+        return bool(self.sentence.processed[self.address])
+
+    @processed.setter
+    def processed(self, value):
+        self.sentence.processed[self.address] = bool(value)
+
+    @property
+    def _children(self):
+        # The children index (see Relation.build_children_index) comes from
+        #   the children arrays, which are always up to date, so it can't be
+        #   built or cleared from outside.
+        return self.sentence.children_index()[self.address]
+
+    @_children.setter
+    def _children(self, value):
+        pass
+
+    _fields = ('address', 'ctag', 'deps', 'feats', 'head', 'lemma',
+               'processed', 'rel', 'tag', 'word')
+
+    def __repr__(self):
+        return '{' + ', '.join('{0}: {1}'.format(key, getattr(self, key))
+                               for key in self._fields) + '}'
+
+
+class ColumnarSentence(object):
+
+    """A sentence stored as parallel arrays, one entry per relation (with the
+        TOP relation at index 0): the heads (-1 for TOP), and the vocabulary
+        IDs of the labels, tags, ctags, words, lemmas and features. The
+        children of each relation are kept in compressed sparse row form:
+        those of relation i are children[child_offsets[i]:child_offsets[i +
+        1]], in increasing order.
+
+        Indexing gives RelationViews; to_relations builds the list of
+        Relations the Engine works with.
+    """
+
+    # The columns holding vocabulary IDs, in serialization order.
+    string_columns = ('labels', 'tags', 'ctags', 'words', 'lemmas', 'feats')
+
+    # Magic number of the serialization format.
+    magic = b'IDC1'
+
+    def __init__(self, vocabulary, heads, **columns):
+        """Form a sentence. Use from_relations, from_conll or from_bytes
+            instead.
+
+        :vocabulary: the Vocabulary of the string columns.
+        :heads: an array of heads.
+        :columns: an array for each name in string_columns.
+        """
+        self.vocabulary = vocabulary
+        self.heads = heads
+        for name in self.string_columns:
+            setattr(self, name, columns[name])
+        # Whether each relation was processed (see RelationView.processed).
+        self.processed = bytearray(len(heads))
+
+        self.build_children()
+
+    @classmethod
+    def from_relations(cls, relations, vocabulary):
+        """Form a sentence from a list of relations.
+
+        :relations: the relations, starting with TOP.
+        :vocabulary: the Vocabulary to use.
+        """
+        vocabulary_id = vocabulary.id
+        heads = array('i', [-1 if relation.head is None else relation.head
+                            for relation in relations])
+        columns = {}
+        for name, attribute in zip(cls.string_columns,
+                                   ('rel', 'tag', 'ctag', 'word', 'lemma',
+                                    'feats')):
+            columns[name] = array('i', [vocabulary_id(getattr(relation,
+                                                              attribute))
+                                        for relation in relations])
+
+        return cls(vocabulary, heads, **columns)
+
+    @classmethod
+    def from_conll(cls, lines, vocabulary):
+        """Form a sentence from its CoNLL lines, without creating Relations.
+            Unlike idd3.conll.iter_sentences, comments, multiword tokens and
+            empty nodes are not supported.
+
+        :lines: the lines of a single sentence.
+        :vocabulary: the Vocabulary to use.
+        """
+        vocabulary_id = vocabulary.id
+        heads = array('i', [-1])
+        columns = dict((name, array('i', [vocabulary_id('TOP')
+                                          if name in ('labels', 'tags',
+                                                      'ctags') else 0]))
+                       for name in cls.string_columns)
+
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            cells = line.split('\t') if '\t' in line else line.split()
+            heads.append(int(cells[6]))
+            for name, cell in (('labels', cells[7]), ('tags', cells[4]),
+                               ('ctags', cells[3]),
+                               ('words', cells[1]),
+                               ('lemmas', cells[2]), ('feats', cells[5])):
+                columns[name].append(vocabulary_id(cell))
+
+        return cls(vocabulary, heads, **columns)
+
+    def __len__(self):
+        return len(self.heads)
+
+    def __getitem__(self, index):
+        if not -len(self) <= index < len(self):
+            raise IndexError('relation index out of range')
+        return RelationView(self, index % len(self))
+
+    def build_children(self):
+        """Rebuild the children arrays from the heads, with a counting
+            sort."""
+        counts = array('i', [0]) * (len(self.heads) + 1)
+        for head in self.heads:
+            if head >= 0:
+                counts[head + 1] += 1
+
+        # Prefix sums give where the children of each relation start.
+        for i in range(1, len(counts)):
+            counts[i] += counts[i - 1]
+        self.child_offsets = counts
+
+        children = array('i', [0]) * counts[-1]
+        position = array('i', counts[:-1])
+        for address, head in enumerate(self.heads):
+            if head >= 0:
+                children[position[head]] = address
+                position[head] += 1
+        self.children = children
+        self._children_index = None
+
+    def children_index(self):
+        """Return, for every relation, a dictionary mapping labels to the
+            indices of its children (see Relation.build_children_index)."""
+        if self._children_index is None:
+            labels = self.labels
+            strings = self.vocabulary.strings
+            index = []
+            for address in range(len(self)):
+                children = {}
+                for child in self.children_of(address):
+                    children.setdefault(strings[labels[child]],
+                                        []).append(child)
+                index.append(children)
+            self._children_index = index
+
+        return self._children_index
+
+    def children_of(self, index):
+        """Return the indices of the children of a relation."""
+        return self.children[self.child_offsets[index]:
+                             self.child_offsets[index + 1]]
+
+    def indices_with_label(self, label):
+        """Return the indices of the relations with a label."""
+        label_id = self.vocabulary.ids.get(label)
+        return [i for i, relation_label in enumerate(self.labels)
+                if relation_label == label_id]
+
+    def delete(self, indices):
+        """Remove relations, like idd3.transform.delete_indices: the heads of
+            relations that point to a removed relation are not changed.
+
+        :indices: the indices of the relations to remove.
+        """
+        removed = sorted(set(index % len(self) for index in indices))
+
+        # The relations kept form runs between the removed ones, so the
+        #   columns are copied a run (a slice) at a time. The new index of
+        #   each relation is built the same way; removed relations get the
+        #   one of the previous relation kept, and the extra -1 at the end
+        #   maps the head of TOP to itself.
+        runs = []
+        new_indices = array('i')
+        start = 0
+        for count, index in enumerate(removed):
+            if index > start:
+                runs.append((start, index))
+            new_indices.extend(range(start - count, index - count))
+            new_indices.append(index - count - 1)
+            start = index + 1
+        if start < len(self):
+            runs.append((start, len(self)))
+        new_indices.extend(range(start - len(removed),
+                                 len(self) - len(removed)))
+        new_indices.append(-1)
+
+        def kept(column):
+            result = column[:0]
+            for start, end in runs:
+                result += column[start:end]
+            return result
+
+        self.heads = array('i', map(new_indices.__getitem__,
+                                    kept(self.heads)))
+        for name in self.string_columns:
+            setattr(self, name, kept(getattr(self, name)))
+        self.processed = kept(self.processed)
+
+        self.build_children()
+
+    def remove_punctuation(self):
+        """Remove the 'p' relations (see idd3.transform.RemovePunctuation)."""
+        indices = self.indices_with_label('p')
+        if indices:
+            self.delete(indices)
+
+    def to_relations(self):
+        """Return the list of Relations of the sentence."""
+        strings = self.vocabulary.strings
+        relations = []
+        for address in range(len(self)):
+            head = self.heads[address]
+            relations.append(Relation(
+                address=address,
+                deps=list(self.children_of(address)),
+                head=None if head < 0 else head,
+                rel=strings[self.labels[address]],
+                tag=strings[self.tags[address]],
+                ctag=strings[self.ctags[address]],
+                word=strings[self.words[address]],
+                lemma=strings[self.lemmas[address]],
+                feats=strings[self.feats[address]]))
+
+        return relations
+
+    def to_bytes(self):
+        """Serialize the sentence. The result holds its own table of the
+            strings it uses, so it doesn't depend on the vocabulary."""
+        local = Vocabulary()
+        strings = self.vocabulary.strings
+        columns = [array('i', [local.id(strings[value])
+                               for value in getattr(self, name)])
+                   for name in self.string_columns]
+
+        table = '\x00'.join(local.strings[1:]).encode('utf-8')
+
+        data = [self.magic, struct.pack('<III', len(self), len(local) - 1,
+                                        len(table)), table]
+        for column in [self.heads] + columns:
+            if sys.byteorder == 'big':
+                column = array('i', column)
+                column.byteswap()
+            data.append(_tobytes(column))
+
+        return b''.join(data)
+
+    @classmethod
+    def from_bytes(cls, data, vocabulary):
+        """Deserialize a sentence written by to_bytes.
+
+        :data: the serialized sentence.
+        :vocabulary: the Vocabulary to use.
+        """
+        if data[:4] != cls.magic:
+            raise ValueError('Not a serialized sentence.')
+
+        length, string_count, table_size = struct.unpack('<III', data[4:16])
+        offset = 16 + table_size
+        table = data[16:offset].decode('utf-8')
+        # Map the IDs of the table to those of the vocabulary.
+        ids = array('i', [0] + [vocabulary.id(string)
+                                for string in table.split('\x00')]
+                    if string_count else [0])
+
+        item_size = array('i').itemsize
+        columns = []
+        for i in range(len(cls.string_columns) + 1):
+            column = array('i')
+            _frombytes(column, data[offset:offset + length * item_size])
+            if sys.byteorder == 'big':
+                column.byteswap()
+            columns.append(column)
+            offset += length * item_size
+
+        heads = columns[0]
+        return cls(vocabulary, heads,
+                   **dict((name, array('i', [ids[value] for value in column]))
+                          for name, column in zip(cls.string_columns,
+                                                  columns[1:])))
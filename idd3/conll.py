@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# IDD3 - Propositional Idea Density from Dependency Trees
+# Copyright (C) 2014-2015  Andre Luiz Verucci da Cunha
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import print_function, unicode_literals, division
+import io
+
+from idd3.base import Relation, intern
+
+
+def _top_relation():
+    """Create the ROOT relation that starts every sentence."""
+    return Relation(address=0, deps=[], rel='TOP', tag='TOP', ctag='TOP',
+                    word=None, lemma=None, feats=None)
+
+
+def _finish_sentence(relations):
+    """Fill the deps of the relations in a sentence from their heads."""
+    for relation in relations[1:]:
+        relations[relation.head].deps.append(relation.address)
+
+    return relations
+
+
+def iter_sentences(lines):
+    """Read sentences in the CoNLL-X or CoNLL-U format, one at a time.
+        Comments, multiword tokens and empty nodes (CoNLL-U) are skipped.
+
+    :lines: an iterable of lines (e.g., an open file).
+    :returns: a generator that yields, for each sentence, its list of
+        relations, starting with the ROOT relation.
+    """
+    relations = None
+
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+
+        if not line:
+            if relations is not None:
+                yield _finish_sentence(relations)
+                relations = None
+            continue
+
+        if line.startswith('#'):
+            continue
+
+        cells = line.split('\t') if '\t' in line else line.split()
+        if len(cells) < 8:
+            raise ValueError('Line {0}: expected at least 8 columns, got {1}.'
+                             .format(line_number, len(cells)))
+
+        if '-' in cells[0] or '.' in cells[0]:
+            continue
+
+        if relations is None:
+            relations = [_top_relation()]
+
+        # Labels and tags come from small sets: interning them keeps a single
+        #   copy of each (see idd3.base.intern).
+        relations.append(Relation(address=int(cells[0]),
+                                  deps=[],
+                                  head=int(cells[6]),
+                                  rel=intern(cells[7]),
+                                  tag=intern(cells[4]),
+                                  ctag=intern(cells[3]),
+                                  word=cells[1],
+                                  lemma=cells[2],
+                                  feats=cells[5]))
+
+    if relations is not None:
+        yield _finish_sentence(relations)
+
+
+def read_conll(path, encoding='utf-8'):
+    """Read the sentences in a CoNLL-X or CoNLL-U file, one at a time,
+        without loading the whole file into memory.
+
+    :path: the path to the file.
+    :encoding: the encoding of the file.
+    :returns: a generator that yields, for each sentence, its list of
+        relations, starting with the ROOT relation.
+    """
+    with io.open(path, mode='r', encoding=encoding) as conll_file:
+        for relations in iter_sentences(conll_file):
+            yield relations
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+# IDD3 - Propositional Idea Density from Dependency Trees
+# Copyright (C) 2014-2015  Andre Luiz Verucci da Cunha
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import print_function, unicode_literals, division
+from collections import defaultdict
+from itertools import islice
+import multiprocessing
+
+from idd3.base import Engine, string_types
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+# The engine used by each worker process, created by _init_worker.
+_engine = None
+
+
+def _init_worker(language):
+    """Create the engine of a worker process.
+
+    :language: the name of the language module (e.g., 'idd3.rules.en').
+    """
+    global _engine
+
+    _engine = Engine.for_language(language)
+
+
+def _analyze_batch(batch):
+    """Analyze a batch of sentences in a worker process.
+
+    :batch: a list of relation lists, one for each sentence.
+    :returns: a list containing the propositions of each sentence. Sentences
+        whose analysis fails get an empty list.
+    """
+    results = []
+    for relations in batch:
+        try:
+            results.append(_engine.analyze(relations))
+        except Exception as e:
+            logger.error('{0} in engine.analyze: {1}'.format(
+                e.__class__.__name__, e))
+            results.append([])
+
+    return results
+
+
+def _batches(sentences, batch_size):
+    """Split an iterable of sentences into lists of at most batch_size
+        sentences.
+    """
+    sentences = iter(sentences)
+    while True:
+        batch = list(islice(sentences, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+class ParallelAnalyzer(object):
+
+    """Analyzes a corpus using a pool of worker processes, each one holding
+        its own Engine configured for the same language."""
+
+    def __init__(self, language, processes=None, batch_size=64):
+        """Form a parallel analyzer.
+
+        :language: the language module (e.g., idd3.rules.en), or its name.
+        :processes: the number of worker processes (defaults to the number
+            of CPUs).
+        :batch_size: the number of sentences sent to a worker at a time.
+        """
+        if not isinstance(language, string_types):
+            language = language.__name__
+
+        self.language = language
+        self.processes = processes
+        self.batch_size = batch_size
+        self.stats = defaultdict(int)
+        self._pool = None
+
+    def start(self):
+        """Start the worker processes."""
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(self.processes,
+                                              initializer=_init_worker,
+                                              initargs=(self.language,))
+
+    def close(self):
+        """Stop the worker processes."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def analyze(self, sentences):
+        """Analyze a sequence of sentences, updating the kind statistics in
+            this instance's 'stats' attribute.
+
+        :sentences: an iterable of relation lists, one for each sentence.
+        :returns: a generator that yields the list of propositions of each
+            sentence, in input order.
+        """
+        self.start()
+
+        for results in self._pool.imap(_analyze_batch,
+                                       _batches(sentences, self.batch_size)):
+            for props in results:
+                for prop in props:
+                    self.stats[prop.kind] += 1
+                yield props
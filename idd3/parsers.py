@@ -16,9 +16,17 @@
 # this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from __future__ import print_function, unicode_literals, division
-from os.path import basename
-import nltk
-from subprocess import call
+from itertools import islice
+from subprocess import Popen, PIPE
+from multiprocessing.pool import ThreadPool
+import threading
+
+try:
+    from queue import Queue
+except ImportError:
+    from Queue import Queue
+
+from idd3.conll import iter_sentences
 
 
 def load_mapping_file(path):
@@ -31,62 +39,498 @@ def load_mapping_file(path):
         return mapping
 
 
-class StanfordUnivDepParser(object):
-
-    """An interface for the Stanford NN Dependency Parser, trained using
-        the Universal Dependencies corpus."""
-
-    def __init__(self, corenlp_path, model_path, pos_mapping_file_path):
-        self.corenlp_path = corenlp_path
-        self.model_path = model_path
-        self.pos_mapping = load_mapping_file(pos_mapping_file_path)
-
-    def normalize_file(self):
-        with open(self.conll_file_path, 'r') as infile, \
-                open(self.norm_file_path, 'w') as outfile:
-            for line in infile.readlines():
-                if not line or line.isspace():
-                    outfile.write(line)
-                else:
-                    entries = [entry.strip() for entry in line.split('\t')]
-                    outfile.write('\t'.join([entries[0],
-                                             entries[1],
-                                             entries[2],
-                                             self.pos_mapping[entries[3]],
-                                             entries[3],
-                                             entries[4],
-                                             entries[5],
-                                             entries[6],
-                                             '_',
-                                             '_',
-                                             ]) + '\n')
+def shell_line(sentence, commands=()):
+    """Put a sentence in a single line, to be written to a parser process
+        that reads one sentence per line.
+
+    :sentence: the sentence, as a string.
+    :commands: the lines the process takes as commands rather than parse,
+        in lower case (see DependencyParser.worker_commands).
+    :returns: the line, without the line break (an empty string if the
+        sentence is empty).
+    """
+    line = ' '.join(sentence.split())
+
+    # CoreNLP's shell compares each whole line to its commands, so a
+    #   trailing space (which the tokenizer ignores) has it parse the line.
+    if line.lower() in commands:
+        line += ' '
+
+    return line
+
+
+def strip_prompt(line, prompt):
+    """Remove the prompts a parser process wrote before a line of output."""
+    while prompt and line.startswith(prompt):
+        line = line[len(prompt):]
+
+    return line
+
+
+def feed_lines(stream, lines, commands=()):
+    """Write sentences to the standard input of a parser process, one per
+        line, from a separate thread, so that the process never waits for
+        its output to be read.
+
+    :stream: the standard input of the process.
+    :lines: an iterable of input lines.
+    :commands: the lines the process takes as commands (see shell_line).
+    :returns: the thread, which closes the stream when it's done.
+    """
+    def feed():
+        try:
+            for line in lines:
+                line = shell_line(line, commands)
+                if line:
+                    stream.write(line + '\n')
+        except (IOError, OSError):
+            # The process exited early.
+            pass
+
+        try:
+            stream.close()
+        except (IOError, OSError):
+            pass
+
+    thread = threading.Thread(target=feed)
+    thread.daemon = True
+    thread.start()
+    return thread
+
+
+class ParserWorker(object):
+
+    """A long-lived parser process. The process must read one sentence per
+        line from its standard input, and write the parse of each sentence
+        to its standard output in the CoNLL format, followed by a blank
+        line."""
+
+    def __init__(self, command, prompt='', commands=()):
+        """Form a worker.
+
+        :command: the command line that starts the parser process.
+        :prompt: a prompt the process writes before reading each sentence,
+            which is removed from its output.
+        :commands: the lines the process takes as commands rather than
+            parse, in lower case (see shell_line).
+        """
+        self.command = command
+        self.prompt = prompt
+        self.commands = commands
+        self.process = None
+
+    def start(self):
+        """Start the parser process."""
+        self.process = Popen(self.command, stdin=PIPE, stdout=PIPE,
+                             universal_newlines=True, bufsize=1)
+
+    def stop(self):
+        """Stop the parser process."""
+        if self.process is not None:
+            process, self.process = self.process, None
+            try:
+                # Fails if the process has exited with input still buffered.
+                process.stdin.close()
+            except (IOError, OSError):
+                pass
+            process.wait()
+            process.stdout.close()
+
+    def parse(self, sentence):
+        """Parse a sentence.
+
+        :sentence: the sentence, as a string.
+        :returns: the CoNLL lines of the parse, without the blank line that
+            ends it (an empty list if the sentence is empty).
+        """
+        line = shell_line(sentence, self.commands)
+        if not line:
+            return []
+
+        self.process.stdin.write(line + '\n')
+        self.process.stdin.flush()
+
+        lines = []
+        while True:
+            line = self.process.stdout.readline()
+            if not line:
+                raise IOError('The parser process exited unexpectedly.')
+            line = strip_prompt(line, self.prompt)
+            if line.isspace():
+                if lines:
+                    return lines
+            else:
+                lines.append(line)
+
+
+class ParserPool(object):
+
+    """A pool of parser workers that can be shared between threads."""
+
+    def __init__(self, command, size=1, prompt='', commands=()):
+        """Form a pool, starting its workers.
+
+        :command: the command line that starts each parser process.
+        :size: the number of workers.
+        :prompt: the prompt of the parser processes (see ParserWorker).
+        :commands: the commands of the parser processes (see ParserWorker).
+        """
+        self.command = command
+        self.size = size
+        self.prompt = prompt
+        self.commands = commands
+        self._workers = Queue()
+
+        for i in range(size):
+            worker = ParserWorker(command, prompt, commands)
+            worker.start()
+            self._workers.put(worker)
+
+    def parse(self, sentence):
+        """Parse a sentence with the first available worker.
+
+        :sentence: the sentence, as a string.
+        :returns: the CoNLL lines of the parse (see ParserWorker.parse).
+        """
+        worker = self._workers.get()
+        try:
+            # A worker is stopped when a parse fails, and started again by
+            #   the next parse that gets it.
+            if worker.process is None:
+                worker.start()
+            return worker.parse(sentence)
+        except Exception:
+            # The worker may be halfway through a parse.
+            worker.stop()
+            raise
+        finally:
+            self._workers.put(worker)
+
+    def parse_many(self, sentences):
+        """Parse several sentences, using all the workers at once.
+
+        :sentences: an iterable of sentences, as strings.
+        :returns: a list containing the CoNLL lines of each parse, in the
+            same order as the sentences.
+        """
+        pool = ThreadPool(self.size)
+        try:
+            return pool.map(self.parse, sentences)
+        finally:
+            pool.close()
+            pool.join()
+
+    def imap(self, sentences):
+        """Like parse_many, but yield each parse as soon as it (and the ones
+            before it) are ready."""
+        pool = ThreadPool(self.size)
+        try:
+            for lines in pool.imap(self.parse, sentences):
+                yield lines
+        finally:
+            pool.close()
+            pool.join()
+
+    def close(self):
+        """Stop all the workers."""
+        for i in range(self.size):
+            self._workers.get().stop()
+
+
+class DependencyParser(object):
+
+    """Common behavior of the parser interfaces: subclasses provide the
+        parser command lines and the normalization of its CoNLL output.
+
+        Unless the worker pool is running (see start_workers), each input is
+        parsed by a single, short-lived parser process (see run_parser),
+        and so are the sentences missing from the cache. The parser reads
+        its input from its standard input and writes the parses to its
+        standard output, so no intermediate files are written.
+    """
+
+    pool = None
+
+    # An idd3.cache.ParseCache, and the number of sentences looked up in it
+    #   at a time when the worker pool is running.
+    cache = None
+    cache_batch_size = 64
+
+    # The prompt of the parser processes (see ParserWorker), and the lines
+    #   they take as commands rather than parse, in lower case (see
+    #   shell_line).
+    worker_prompt = ''
+    worker_commands = ()
+
+    def worker_command(self):
+        """The command line of a parser process that parses one sentence per
+            line from its standard input (see ParserWorker). Parsers whose
+            output can't be produced by such a process don't have one."""
+        raise NotImplementedError
+
+    def start_workers(self, size=1, command=None):
+        """Keep a pool of parser processes running, so that the JVM and the
+            model are loaded only once.
+
+        :size: the number of parser processes.
+        :command: the command line of each process (defaults to the one
+            given by worker_command).
+        """
+        self.pool = ParserPool(command or self.worker_command(), size,
+                               self.worker_prompt, self.worker_commands)
+
+    def stop_workers(self):
+        """Stop the pool started by start_workers."""
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+
+    def parser_command(self, line_sentences=False):
+        """The command line of a single, short-lived parser process, which
+            reads its input from its standard input (see run_parser).
+
+        :line_sentences: whether each input line must be parsed as a single
+            sentence; otherwise, the parser splits the input into sentences
+            the same way as when it reads a file.
+        """
+        return self.worker_command()
+
+    def run_parser(self, lines, line_sentences=False):
+        """Parse some text in a single, short-lived parser process.
+
+        :lines: an iterable of input lines.
+        :line_sentences: whether each line is a single sentence (see
+            parser_command).
+        :returns: an iterable of the CoNLL lines written by the parser.
+        """
+        process = Popen(self.parser_command(line_sentences), stdin=PIPE,
+                        stdout=PIPE, universal_newlines=True)
+        feeder = feed_lines(process.stdin, lines, self.worker_commands)
+
+        try:
+            for line in process.stdout:
+                line = strip_prompt(line, self.worker_prompt)
+                if line:
+                    yield line
+        finally:
+            process.stdout.close()
+            process.wait()
+            feeder.join()
+
+    def run_parser_on(self, sentences):
+        """Parse a list of sentences with run_parser.
+
+        :sentences: a list of sentences, as strings.
+        :returns: a list containing the CoNLL lines of each parse, in the
+            same order as the sentences.
+        """
+        parses = []
+        lines = []
+        for line in self.run_parser(sentences, line_sentences=True):
+            if line.isspace():
+                if lines:
+                    parses.append(lines)
+                    lines = []
+            else:
+                lines.append(line)
+        if lines:
+            parses.append(lines)
+
+        if len(parses) != len(sentences):
+            raise IOError('The parser returned {0} parses for {1} '
+                          'sentences.'.format(len(parses), len(sentences)))
+
+        return parses
+
+    def parse_sentences(self, sentences):
+        """Parse a list of sentences, with the worker pool if it's running.
+
+        :sentences: a list of sentences, as strings.
+        :returns: a list containing the CoNLL lines of each parse, in the
+            same order as the sentences.
+        """
+        if self.pool is None:
+            return self.run_parser_on(sentences)
+
+        return self.pool.parse_many(sentences)
+
+    def parse_lines(self, filename):
+        """Parse a file, using the worker pool if it's running.
+
+        :filename: the input file, with one sentence per line.
+        :returns: an iterable of the CoNLL lines of the parses, with a blank
+            line after each sentence.
+        """
+        with open(filename, 'r') as infile:
+            if self.pool is None:
+                for line in self.run_parser(infile):
+                    yield line
+                return
+
+            for lines in self.pool.imap(infile):
+                if lines:
+                    for line in lines:
+                        yield line
+                    yield '\n'
+
+    def normalize_lines(self, lines):
+        """Normalize the parser output, one line at a time.
+
+        :lines: an iterable of CoNLL lines.
+        :returns: a generator of normalized CoNLL lines.
+        """
+        raise NotImplementedError
+
+    def parser_options(self):
+        """The command line options that select the parser and its model,
+            used to key its trees in the cache."""
+        return self.worker_command()
+
+    def parser_id(self):
+        """A string identifying the parser, its model and the normalization
+            of its output, used to key its trees in the cache."""
+        mapping = ['{0}={1}'.format(tag, ctag)
+                   for tag, ctag in sorted(self.pos_mapping.items())]
+        return '\0'.join([self.__class__.__name__] + self.parser_options() +
+                          mapping)
+
+    def cached_lines(self, filename):
+        """Parse a file, looking each sentence up in the cache first. The
+            other sentences are parsed the same way as without the cache
+            (see parse_sentences), all at once if the worker pool isn't
+            running, and their normalized trees are stored in the cache.
+
+        :filename: the input file, with one sentence per line.
+        :returns: an iterable of the normalized CoNLL lines of the parses,
+            with a blank line after each sentence.
+        """
+        parser_id = self.parser_id()
+        # Without workers, each run of the parser loads its model again.
+        batch_size = self.cache_batch_size if self.pool is not None else None
+
+        with open(filename, 'r') as infile:
+            sentences = (line for line in infile if not line.isspace())
+            while True:
+                batch = list(islice(sentences, batch_size))
+                if not batch:
+                    break
+
+                keys = [self.cache.key(parser_id, sentence)
+                        for sentence in batch]
+                trees = [self.cache.get(key) for key in keys]
+
+                missing = [i for i, tree in enumerate(trees) if tree is None]
+                if missing:
+                    parses = self.parse_sentences([batch[i] for i in missing])
+                    for i, lines in zip(missing, parses):
+                        trees[i] = list(self.normalize_lines(lines))
+                        self.cache.put(keys[i], trees[i])
+
+                for tree in trees:
+                    for line in tree:
+                        yield line
+                    yield '\n'
+
+    def normalized_lines(self, filename):
+        """Parse a file, using the cache if there is one.
+
+        :filename: the input file, with one sentence per line.
+        :returns: an iterable of the normalized CoNLL lines of the parses.
+        """
+        if self.cache is not None:
+            return self.cached_lines(filename)
+
+        return self.normalize_lines(self.parse_lines(filename))
+
+    def iter_parse_raw_file(self, filename):
+        """Parse a raw text file, without writing any intermediate files.
+
+        :filename: the input file, with one sentence per line.
+        :returns: a generator that yields, for each sentence, its list of
+            relations (see idd3.conll.iter_sentences).
+        """
+        return iter_sentences(self.normalized_lines(filename))
 
     def parse_raw_file(self, filename):
-        self.conll_file_path = '/tmp/{0}.conll'.format(basename(filename))
-        self.norm_file_path = '/tmp/{0}.norm.conll'.format(basename(filename))
+        """Parse a raw text file.
+
+        :filename: the input file, with one sentence per line.
+        :returns: a list of nltk's DependencyGraph, one for each sentence.
+        """
+        # nltk takes long to import, and only this method needs it.
+        from nltk.parse.dependencygraph import DependencyGraph
+
+        graphs = []
+        block = []
+        for line in self.normalized_lines(filename):
+            if line.isspace():
+                if block:
+                    graphs.append(DependencyGraph(''.join(block)))
+                    block = []
+            else:
+                block.append(line)
+
+        if block:
+            graphs.append(DependencyGraph(''.join(block)))
 
-        stanford_run_cmd = ['java', '-mx1024m',
-                            '-cp', self.corenlp_path + '/*:',
-                            'edu.stanford.nlp.pipeline.StanfordCoreNLP',
-                            '-annotators', 'tokenize,ssplit,pos,depparse',
-                            '-depparse.model', self.model_path,
-                            '-outputFormat', 'conll',
-                            '-outputDirectory', '/tmp/', '-file', filename]
-
-        call(stanford_run_cmd)
-
-        self.normalize_file()
+        return graphs
 
-        graphs = nltk.parse.dependencygraph.DependencyGraph.load(
-            self.norm_file_path)
 
-        if len(graphs) and len(graphs[-1].nodelist) == 1:
-            del graphs[-1]
+class StanfordUnivDepParser(DependencyParser):
 
-        return graphs
+    """An interface for the Stanford NN Dependency Parser, trained using
+        the Universal Dependencies corpus."""
 
+    # CoreNLP reads its standard input in an interactive shell, which parses
+    #   each line on its own, writes a prompt before reading each of them,
+    #   and quits on some commands.
+    worker_prompt = 'NLP> '
+    worker_commands = ('q', 'quit', 'exit')
 
-class StanfordParser(object):
+    def __init__(self, corenlp_path, model_path, pos_mapping_file_path,
+                 cache=None):
+        self.corenlp_path = corenlp_path
+        self.model_path = model_path
+        self.pos_mapping = load_mapping_file(pos_mapping_file_path)
+        self.cache = cache
+
+    def corenlp_command(self, *options):
+        return ['java', '-mx1024m',
+                '-cp', self.corenlp_path + '/*:',
+                'edu.stanford.nlp.pipeline.StanfordCoreNLP',
+                '-annotators', 'tokenize,ssplit,pos,depparse',
+                '-depparse.model', self.model_path,
+                '-outputFormat', 'conll'] + list(options)
+
+    def worker_command(self):
+        return self.corenlp_command('-ssplit.eolonly', 'true')
+
+    def parser_command(self, line_sentences=False):
+        if line_sentences:
+            return self.worker_command()
+
+        return self.corenlp_command()
+
+    def normalize_lines(self, lines):
+        for line in lines:
+            if not line or line.isspace():
+                yield line
+            else:
+                entries = [entry.strip() for entry in line.split('\t')]
+                yield '\t'.join([entries[0],
+                                 entries[1],
+                                 entries[2],
+                                 self.pos_mapping[entries[3]],
+                                 entries[3],
+                                 entries[4],
+                                 entries[5],
+                                 entries[6],
+                                 '_',
+                                 '_',
+                                 ]) + '\n'
+
+
+class StanfordParser(DependencyParser):
 
     """An interface for the Stanford Parser with default Stanford
         Dependencies."""
@@ -96,9 +540,61 @@ class StanfordParser(object):
     # the normalize.java file that ships with the standard English version
     # of the Universal Dependencies treebank.
 
-    def __init__(self, stanford_path, pos_mapping_file_path):
+    def __init__(self, stanford_path, pos_mapping_file_path, cache=None):
         self.stanford_path = stanford_path
         self.pos_mapping = load_mapping_file(pos_mapping_file_path)
+        self.cache = cache
+
+    # The trees are converted to dependencies by a second process, which
+    #   reads all of its input before writing anything, so this parser has
+    #   no worker mode: every input is parsed by run_parser, with the
+    #   parser reading from its standard input ('-').
+
+    def worker_command(self):
+        raise NotImplementedError('StanfordParser has no worker mode.')
+
+    def start_workers(self, size=1, command=None):
+        raise NotImplementedError('StanfordParser has no worker mode; each '
+                                  'input is parsed by a single run of the '
+                                  'parser.')
+
+    def parse_command(self, line_sentences=False):
+        options = ['-sentences', 'newline'] if line_sentences else []
+        return ['java', '-mx1024m',
+                '-cp', self.stanford_path + '/*:',
+                'edu.stanford.nlp.parser.lexparser.LexicalizedParser'] + \
+            options + \
+            ['-outputFormat', 'penn',
+             'edu/stanford/nlp/models/lexparser/englishPCFG.ser.gz', '-']
+
+    def convert_command(self):
+        return ['java', '-mx1024m',
+                '-cp', self.stanford_path + '/*:',
+                'edu.stanford.nlp.trees.EnglishGrammaticalStructure',
+                '-conllx', '-basic', '-makeCopulaHead', '-keepPunct',
+                '-treeFile', '/dev/stdin']
+
+    def parser_options(self):
+        # The cache parses one sentence per line (see run_parser_on).
+        return self.parse_command(True) + self.convert_command()
+
+    def run_parser(self, lines, line_sentences=False):
+        run_process = Popen(self.parse_command(line_sentences), stdin=PIPE,
+                            stdout=PIPE, universal_newlines=True)
+        convert_process = Popen(self.convert_command(),
+                                stdin=run_process.stdout, stdout=PIPE,
+                                universal_newlines=True)
+        run_process.stdout.close()
+        feeder = feed_lines(run_process.stdin, lines)
+
+        try:
+            for line in convert_process.stdout:
+                yield line
+        finally:
+            convert_process.stdout.close()
+            convert_process.wait()
+            run_process.wait()
+            feeder.join()
 
     @staticmethod
     def get_normalized_word(node):
@@ -195,53 +691,31 @@ class StanfordParser(object):
 
         return tag
 
-    def normalize_file(self):
-        graphs = nltk.parse.dependencygraph.DependencyGraph.load(
-            self.conll_file_path)
-
-        if len(graphs) and len(graphs[-1].nodelist) == 1:
-            del graphs[-1]
-
-        for graph in graphs:
-            for node in graph.nodelist:
-                node['word'] = self.get_normalized_word(node)
-                node['rel'] = self.get_normalized_label(node)
-                node['tag'] = self.get_normalized_tag(node)
-                node['ctag'] = self.pos_mapping[node['tag']]\
-                    if node['tag'] != 'TOP' else node['ctag']
-
-        with open(self.norm_file_path, 'w') as outputfile:
-            for graph in graphs:
-                outputfile.write(graph.to_conll(10) + '\n')
-
-    def parse_raw_file(self, filename):
-        self.tree_file_path = '/tmp/{0}.tree'.format(basename(filename))
-        self.conll_file_path = '/tmp/{0}.conll'.format(basename(filename))
-        self.norm_file_path = '/tmp/{0}.norm.conll'.format(basename(filename))
-
-        run_cmd = ['java', '-mx1024m',
-                   '-cp', self.stanford_path + '/*:',
-                   'edu.stanford.nlp.parser.lexparser.LexicalizedParser',
-                   '-outputFormat', 'penn',
-                   'edu/stanford/nlp/models/lexparser/englishPCFG.ser.gz',
-                   filename]
-        convert_tree_cmd = ['java', '-mx1024m',
-                            '-cp', self.stanford_path + '/*:',
-                            'edu.stanford.nlp.trees.EnglishGrammaticalStructure',
-                            '-conllx', '-basic', '-makeCopulaHead', '-keepPunct',
-                            '-treeFile', self.tree_file_path]
-
-        with open(self.tree_file_path, mode='w') as tree_file,\
-                open(self.conll_file_path, mode='w') as conll_file:
-            call(run_cmd, stdout=tree_file)
-            call(convert_tree_cmd, stdout=conll_file)
-
-        self.normalize_file()
-
-        graphs = nltk.parse.dependencygraph.DependencyGraph.load(
-            self.norm_file_path)
-
-        if len(graphs) and len(graphs[-1].nodelist) == 1:
-            del graphs[-1]
-
-        return graphs
+    def normalize_lines(self, lines):
+        for line in lines:
+            if not line or line.isspace():
+                yield line
+                continue
+
+            entries = [entry.strip() for entry in line.split('\t')]
+            node = {'word': entries[1],
+                    'ctag': entries[3],
+                    'tag': entries[4],
+                    'rel': entries[7]}
+
+            node['word'] = self.get_normalized_word(node)
+            node['rel'] = self.get_normalized_label(node)
+            node['tag'] = self.get_normalized_tag(node)
+            node['ctag'] = self.pos_mapping[node['tag']]
+
+            yield '\t'.join([entries[0],
+                             node['word'],
+                             entries[2],
+                             node['ctag'],
+                             node['tag'],
+                             entries[5],
+                             entries[6],
+                             node['rel'],
+                             '_',
+                             '_',
+                             ]) + '\n'
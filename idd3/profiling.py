@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+# IDD3 - Propositional Idea Density from Dependency Trees
+# Copyright (C) 2014-2015  Andre Luiz Verucci da Cunha
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import print_function, unicode_literals, division
+from collections import defaultdict
+from contextlib import contextmanager
+import io
+import json
+
+from idd3.base import timer
+
+
+class Profiler(object):
+
+    """Collects timings of an analysis, aggregated across all the sentences
+        given to an Engine (see Engine.__init__): for each Ruleset class, the
+        number of calls and their cumulative and self times; for each
+        Transformation, the number of calls and their total time. Times are
+        in seconds.
+
+        Other steps, such as parsing, can be timed with the section method.
+    """
+
+    def __init__(self):
+        # Name -> [calls, cumulative time, self time].
+        self.rulesets = defaultdict(lambda: [0, 0.0, 0.0])
+        # Name -> [calls, time].
+        self.transformations = defaultdict(lambda: [0, 0.0])
+        self.sections = defaultdict(lambda: [0, 0.0])
+        # Semicolon-separated call stack -> self time.
+        self.stacks = defaultdict(float)
+
+        # The rulesets being run, as [name, stack, start, time in children],
+        #   and how many times each name appears.
+        self._running = []
+        self._active = defaultdict(int)
+
+    def enter(self, name):
+        """Record the start of a ruleset call.
+
+        :name: the name of the ruleset class.
+        """
+        if self._running:
+            stack = self._running[-1][1] + ';' + name
+        else:
+            stack = 'analyze;' + name
+
+        self._active[name] += 1
+        self._running.append([name, stack, timer(), 0.0])
+
+    def exit(self):
+        """Record the end of the last ruleset call started by enter."""
+        name, stack, start, children = self._running.pop()
+        elapsed = timer() - start
+        self._active[name] -= 1
+
+        if self._running:
+            self._running[-1][3] += elapsed
+
+        stats = self.rulesets[name]
+        stats[0] += 1
+        # Recursive calls are already counted by the outermost one.
+        if not self._active[name]:
+            stats[1] += elapsed
+        stats[2] += elapsed - children
+        self.stacks[stack] += elapsed - children
+
+    def add_transformation(self, name, elapsed):
+        """Record a transformation call.
+
+        :name: the name of the transformation class.
+        :elapsed: the time it took.
+        """
+        stats = self.transformations[name]
+        stats[0] += 1
+        stats[1] += elapsed
+        self.stacks['transform;' + name] += elapsed
+
+    @contextmanager
+    def section(self, name):
+        """Time a block of code, e.g.:
+
+            with profiler.section('parse'):
+                sentences = list(parser.iter_parse_raw_file(path))
+
+        :name: the name of the section.
+        """
+        start = timer()
+        try:
+            yield
+        finally:
+            elapsed = timer() - start
+            stats = self.sections[name]
+            stats[0] += 1
+            stats[1] += elapsed
+            self.stacks[name] += elapsed
+
+    def to_dict(self):
+        """Return the collected timings as a dictionary."""
+        return {
+            'rulesets': dict((name, {'calls': calls,
+                                     'cumulative': cumulative,
+                                     'self': self_time})
+                             for name, (calls, cumulative, self_time)
+                             in self.rulesets.items()),
+            'transformations': dict((name, {'calls': calls, 'time': elapsed})
+                                    for name, (calls, elapsed)
+                                    in self.transformations.items()),
+            'sections': dict((name, {'calls': calls, 'time': elapsed})
+                             for name, (calls, elapsed)
+                             in self.sections.items()),
+        }
+
+    def write_json(self, path):
+        """Write the collected timings to a JSON file (see to_dict)."""
+        with io.open(path, 'w', encoding='utf-8') as json_file:
+            json_file.write(json.dumps(self.to_dict(), indent=2,
+                                       sort_keys=True))
+
+    def write_collapsed(self, path):
+        """Write the self time of each call stack, in microseconds, to a file
+            in the collapsed format read by flamegraph.pl and speedscope."""
+        with io.open(path, 'w', encoding='utf-8') as collapsed_file:
+            for stack, elapsed in sorted(self.stacks.items()):
+                collapsed_file.write('{0} {1}\n'.format(
+                    stack, int(round(elapsed * 1e6))))
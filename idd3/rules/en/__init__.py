@@ -102,3 +102,4 @@ GERUND_TAGS = ('VBG')
 config.from_object(__name__)
 
 all_transformations = transform.all_transformations
+fused_transformations = transform.fused_transformations
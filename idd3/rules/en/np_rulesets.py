@@ -36,8 +36,9 @@ class NounPhraseRuleset(universal.np_rulesets.NounPhraseRuleset):
         pobj_index = Relation.get_children_with_dep('adpobj', relations,
                                                     prep_index)[0]
 
-        pobj_return_value = engine.analyze(relations, pobj_index, context +
-                                           [index, prep_index])
+        pobj_return_value = engine.analyze(
+            relations, pobj_index,
+            context.descend(index).descend(prep_index))
 
         for noun in pobj_return_value['return_list']:
             engine.emit((noun, relations[index].word + ' ' +
@@ -228,7 +229,8 @@ class PossRuleset(NounPhraseRuleset):
                 possessive_index = Relation.get_children_with_dep('adp',
                                                                   relations,
                                                                   index)[0]
-                engine.analyze(relations, possessive_index, context + [index])
+                engine.analyze(relations, possessive_index,
+                               context.descend(index))
 
                 referent = relations[context[-1]].word
                 for item in this:
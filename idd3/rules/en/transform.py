@@ -17,7 +17,11 @@
 
 from __future__ import print_function, unicode_literals, division
 from idd3 import Relation, Transformation
-from idd3.transform import delete_indices, RemovePunctuation
+from idd3.transform import delete_indices, RemovePunctuation, \
+    FusedTransformation
+
+
+noun_tags = frozenset(['NN', 'NNS', 'NNP', 'NNPS'])
 
 
 class RemoveParataxisFillers(Transformation):
@@ -44,6 +48,13 @@ class JoinNoLonger(Transformation):
 
     """Joins 'no longer' as a multiword expression."""
 
+    trigger_words = ('no',)
+
+    def matches(self, relations, index):
+        return relations[index].word == 'no'\
+            and (index + 1 == len(relations)
+                 or relations[index + 1].word == 'longer')
+
     def transform(self, relations):
         for i in range(len(relations)):
             if relations[i].word == 'no' and relations[i + 1].word == 'longer':
@@ -55,6 +66,13 @@ class JoinBecauseOf(Transformation):
 
     """Joins 'because of' as a multiword expression."""
 
+    trigger_words = ('because',)
+
+    def matches(self, relations, index):
+        return relations[index].word == 'because'\
+            and (index + 1 == len(relations)
+                 or relations[index + 1].word == 'of')
+
     def transform(self, relations):
         for i in range(len(relations)):
             if relations[i].word == 'because' and relations[i + 1].word == 'of':
@@ -65,6 +83,14 @@ class JoinUpTo(Transformation):
 
     """Joins 'up to'."""
 
+    trigger_words = ('up',)
+    normalizes = True
+
+    def matches(self, relations, index):
+        return relations[index].word == 'up'\
+            and index + 1 < len(relations)\
+            and relations[index + 1].word == 'to'
+
     def transform(self, relations):
         indices_to_delete = []
         for i in range(len(relations)):
@@ -82,6 +108,14 @@ class JoinAtAll(Transformation):
 
     """Joins 'at all'."""
 
+    trigger_words = ('at',)
+    normalizes = True
+
+    def matches(self, relations, index):
+        return relations[index].word == 'at'\
+            and index + 1 < len(relations)\
+            and relations[index + 1].word == 'all'
+
     def transform(self, relations):
         indices_to_delete = []
         for i in range(len(relations)):
@@ -99,6 +133,13 @@ class JoinACoupleOf(Transformation):
 
     """Joins 'a couple of' into a single node."""
 
+    trigger_words = ('a',)
+
+    def matches(self, relations, index):
+        return index + 2 < len(relations)\
+            and relations[index + 1].word == 'couple'\
+            and relations[index + 2].word == 'of'
+
     def transform(self, relations):
         for i, relation in enumerate(relations):
             if relation.word\
@@ -127,6 +168,13 @@ class JoinANumberOf(Transformation):
 
     """Joins 'a number of' into a single node."""
 
+    trigger_words = ('a',)
+
+    def matches(self, relations, index):
+        return index + 2 < len(relations)\
+            and relations[index + 1].word == 'number'\
+            and relations[index + 2].word == 'of'
+
     def transform(self, relations):
         for i, relation in enumerate(relations):
             if relation.word\
@@ -155,6 +203,12 @@ class JoinOneDay(Transformation):
 
     """Join 'one day' as temporal modifier."""
 
+    trigger_words = ('day',)
+
+    def matches(self, relations, index):
+        return relations[index].word == 'day'\
+            and relations[index].rel == 'nmod'
+
     def transform(self, relations):
         for i, relation in enumerate(relations):
             if relation.word == 'day' and relation.rel == 'nmod'\
@@ -167,6 +221,13 @@ class JoinFirstOfAll(Transformation):
 
     """Joins 'first of all' into a single node."""
 
+    trigger_words = ('first',)
+
+    def matches(self, relations, index):
+        return index + 2 < len(relations)\
+            and relations[index + 1].word == 'of'\
+            and relations[index + 2].word == 'all'
+
     def transform(self, relations):
         for i, relation in enumerate(relations):
             if relation.word\
@@ -183,6 +244,14 @@ class JoinNotEven(Transformation):
 
     """Handles 'not even', joining it in a single node."""
 
+    trigger_words = ('not',)
+    normalizes = True
+
+    def matches(self, relations, index):
+        return index >= 1\
+            and relations[index].tag == 'RB'\
+            and relations[index].head == index + 1
+
     def transform(self, relations):
         indices_to_delete = []
 
@@ -202,6 +271,8 @@ class JoinNotEven(Transformation):
 class JoinMultiWordExpressions(Transformation):
     """Joins multi-word expressions in a single node. """
 
+    trigger_rels = ('mwe',)
+
     def transform(self, relations):
         mwes = {}
 
@@ -224,12 +295,22 @@ class JoinPhrasalModifiers(Transformation):
     """Joins phrasal modal and aspectual markers (e.g., "have to", "ought to",
         "used to", etc) to the main verb of a sentence. """
 
-    verb_forms = ['have', 'has', 'had', 'ought', 'use', 'uses', 'used']
+    verb_forms = frozenset(['have', 'has', 'had', 'ought', 'use', 'uses',
+                            'used'])
+    head_rels = frozenset(['null', 'ROOT', 'xcomp', 'rcmod'])
+    verb_tags = frozenset(['VBZ', 'VBD', 'VBP', 'VB'])
+
+    trigger_words = verb_forms
+
+    def matches(self, relations, index):
+        return relations[index].rel in self.head_rels\
+            and relations[index].tag in self.verb_tags\
+            and relations[index].word in self.verb_forms
 
     def transform(self, relations):
         for index, relation in enumerate(relations):
-            if relation.rel in ('null', 'ROOT', 'xcomp', 'rcmod')\
-                    and relation.tag in ('VBZ', 'VBD', 'VBP', 'VB')\
+            if relation.rel in self.head_rels\
+                    and relation.tag in self.verb_tags\
                     and relation.word in self.verb_forms:
                 xcomp_indices = Relation.get_children_with_dep('xcomp',
                                                                relations,
@@ -267,6 +348,13 @@ class JoinDoublePrepositions(Transformation):
 
     """Handles double prepositions, as in 'As of 2014'."""
 
+    trigger_tags = ('IN',)
+    normalizes = True
+
+    def matches(self, relations, index):
+        return index + 1 < len(relations)\
+            and relations[index + 1].tag == 'IN'
+
     def transform(self, relations):
         indices_to_delete = []
 
@@ -290,6 +378,9 @@ class JoinExpletives(Transformation):
 
     """Handles expletives, as in 'there is', or 'there are'."""
 
+    trigger_tags = ('EX',)
+    normalizes = True
+
     def transform(self, relations):
         indices_to_delete = []
 
@@ -306,6 +397,14 @@ class JoinThereModifiers(Transformation):
 
     """Handles phrases like 'up there', 'down there', and 'right there'."""
 
+    trigger_words = ('up', 'down', 'right')
+    normalizes = True
+
+    def matches(self, relations, index):
+        return index >= 1\
+            and index + 1 < len(relations)\
+            and relations[index + 1].word == 'there'
+
     def transform(self, relations):
         indices_to_delete = []
 
@@ -326,6 +425,15 @@ class FixAdjectiveRepetition(Transformation):
         long time.). In this case, the first adjective is turned into an
         adverb and connected to the second adjective."""
 
+    trigger_tags = ('JJ',)
+
+    def matches(self, relations, index):
+        return index + 1 < len(relations)\
+            and relations[index + 1].tag == 'JJ'\
+            and relations[index + 1].word == relations[index].word\
+            and relations[index + 1].head == relations[index].head\
+            and relations[index + 1].rel == relations[index].rel
+
     def transform(self, relations):
         for i in range(len(relations)):
             if relations[i].tag == 'JJ':
@@ -346,6 +454,15 @@ class FixAdverbRepetition(Transformation):
         In this case, we make sure the first adverb is connected to the second,
         not to the following word (usually an adjective)."""
 
+    trigger_tags = ('RB',)
+
+    def matches(self, relations, index):
+        return index + 1 < len(relations)\
+            and relations[index + 1].tag == 'RB'\
+            and relations[index + 1].word == relations[index].word\
+            and relations[index + 1].rel == relations[index].rel\
+            and relations[index].head != index + 1
+
     def transform(self, relations):
         for i in range(len(relations)):
             if relations[i].tag == 'RB':
@@ -364,14 +481,22 @@ class FixReflexivePronouns(Transformation):
     """Handles reflexive pronouns following nouns. Here, we connect the
         pronoun to the previous noun as an adjectival modifier."""
 
-    reflexive_pronouns = ['myself', 'yourself', 'himself', 'herself', 'itself',
-                          'ourselves', 'yourselves', 'themselves']
+    reflexive_pronouns = frozenset(['myself', 'yourself', 'himself',
+                                    'herself', 'itself', 'ourselves',
+                                    'yourselves', 'themselves'])
+
+    trigger_words = reflexive_pronouns
+
+    def matches(self, relations, index):
+        return relations[index].tag == 'PRP'\
+            and relations[index].word in self.reflexive_pronouns\
+            and relations[index - 1].tag in noun_tags
 
     def transform(self, relations):
         for i in range(len(relations)):
             if relations[i].tag == 'PRP'\
                     and relations[i].word in self.reflexive_pronouns\
-                    and relations[i - 1].tag in ('NN', 'NNS', 'NNP', 'NNPS'):
+                    and relations[i - 1].tag in noun_tags:
                 relations[relations[i].head].deps.remove(i)
                 relations[i].head = i - 1
                 relations[i].rel = 'amod'
@@ -383,12 +508,17 @@ class FixXcompAttributions(Transformation):
 
     """Turns xcomp relations with no cop children to 'what'."""
 
-# TODO: check if this is still applicable.
+    trigger_rels = ('xcomp',)
+    tags = noun_tags | frozenset(['JJ'])
+
+    def matches(self, relations, index):
+        return relations[index].tag in self.tags
 
+    # TODO: check if this is still applicable.
     def transform(self, relations):
         for index, relation in enumerate(relations):
             if relation.rel == 'xcomp'\
-                    and relation.tag in ('NN', 'NNS', 'NNP', 'NNPS', 'JJ'):
+                    and relation.tag in self.tags:
                 if not Relation.get_children_with_dep('cop', relations, index):
                     relation.rel = 'what'
 
@@ -412,6 +542,8 @@ class TransformCompmodJoin(Transformation):
     """Transforms compmod into compmod-join if both words start with capital
         letters."""
 
+    trigger_rels = ('compmod',)
+
     def transform(self, relations):
         for relation in relations:
             if relation.rel == 'compmod':
@@ -424,6 +556,8 @@ class TransformCcIntoPreconj(Transformation):
 
     """Transforms cc back to preconj, when it's the case."""
 
+    trigger_rels = ('cc',)
+
     def transform(self, relations):
         for i in range(len(relations)):
             cc_indices = Relation.get_children_with_dep('cc', relations, i)
@@ -457,3 +591,12 @@ all_transformations = [RemovePunctuation(),
                        TransformCompmodJoin(),
                        TransformCcIntoPreconj(),
                        ]
+
+
+# The same pipeline as all_transformations, but scanning each sentence only
+#   once to skip the pattern-matching transformations that don't apply.
+fused_transformations = [RemovePunctuation(),
+                         RemoveParataxisFillers(),
+                         RemoveUtteranceInitialConjunction(),
+                         FusedTransformation(all_transformations[3:]),
+                         ]
@@ -30,7 +30,7 @@ class AdjectivalPhraseRuleset(Ruleset):
 
         advmod_indices = Relation.get_children_with_dep('advmod', relations,
                                                         index)
-        advmods = [engine.analyze(relations, i, context + [index],
+        advmods = [engine.analyze(relations, i, context.descend(index),
                                   {'no_emit': True})
                    for i in advmod_indices]
 
@@ -43,7 +43,7 @@ class AdjectivalPhraseRuleset(Ruleset):
 
         advmod_indices = Relation.get_children_with_dep('nmod', relations,
                                                         index)
-        nmods = [engine.analyze(relations, i, context + [index])
+        nmods = [engine.analyze(relations, i, context.descend(index))
                  for i in advmod_indices]
 
         return nmods
@@ -59,7 +59,7 @@ class AdjectivalPhraseRuleset(Ruleset):
             if 'subj' not in info:
                 info['subj'] = {'return_list': ['NO_SUBJ'],
                                 'rcmod_wdt': None}
-            engine.analyze(relations, i, context + [index], info)
+            engine.analyze(relations, i, context.descend(index), info)
 
     @staticmethod
     def process_adpmods(relations, index, context, engine, info):
@@ -69,7 +69,7 @@ class AdjectivalPhraseRuleset(Ruleset):
         prep_indices = Relation.get_children_with_dep('adpmod', relations,
                                                       index)
         for prep_index in prep_indices:
-            engine.analyze(relations, prep_index, context + [index])
+            engine.analyze(relations, prep_index, context.descend(index))
 
     def extract(self, relations, index, context, engine, info={}):
         advmods = AdjectivalPhraseRuleset.process_advmods(relations, index,
@@ -32,7 +32,7 @@ class AdverbialPhraseRuleset(Ruleset):
                                                           relations, index)
         if npadvmod_indices != []:
             npadvmod = engine.analyze(relations, npadvmod_indices[0],
-                                      context + [index])
+                                      context.descend(index))
             engine.emit((relations[index].word, npadvmod), 'M')
 
     @staticmethod
@@ -43,7 +43,7 @@ class AdverbialPhraseRuleset(Ruleset):
         advmod_indices = Relation.get_children_with_dep('advmod',
                                                         relations, index)
         for i in advmod_indices:
-            advmod = engine.analyze(relations, i, context + [index],
+            advmod = engine.analyze(relations, i, context.descend(index),
                                     {'no_emit': True})
             engine.emit((relations[index].word, advmod), 'M')
 
@@ -55,7 +55,7 @@ class AdverbialPhraseRuleset(Ruleset):
         prep_indices = Relation.get_children_with_dep('adpmod', relations,
                                                       index)
         for prep_index in prep_indices:
-            engine.analyze(relations, prep_index, context + [index])
+            engine.analyze(relations, prep_index, context.descend(index))
 
     def extract(self, relations, index, context, engine, info={}):
         if 'num' in info:
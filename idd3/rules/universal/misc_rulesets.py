@@ -16,7 +16,7 @@
 # this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from __future__ import print_function, unicode_literals, division
-from idd3 import Relation, Ruleset, config
+from idd3 import Relation, Ruleset
 from idd3.rules.universal.np_rulesets import NounPhraseRuleset
 from idd3.rules.universal.vp_rulesets import VerbPhraseRuleset
 from idd3.rules.universal.adjp_rulesets import AdjectivalPhraseRuleset
@@ -32,7 +32,8 @@ class TopRuleset(Ruleset):
     rel = 'TOP'
 
     def extract(self, relations, index, context, engine, info={}):
-        return engine.analyze(relations, relations[index].deps[0], [index])
+        return engine.analyze(relations, relations[index].deps[0],
+                              context.descend(index))
 
 
 class ConjRuleset(NounPhraseRuleset, VerbPhraseRuleset):
@@ -100,9 +101,10 @@ class CompmodJoinRuleset(Ruleset):
             # Consume the conjunction.
             cc_indices = Relation.get_children_with_dep('cc', relations, index)
             for i in cc_indices:
-                engine.analyze(relations, cc_indices[0], context + [index])
+                engine.analyze(relations, cc_indices[0],
+                               context.descend(index))
 
-            conjs = [engine.analyze(relations, i, context + [index],
+            conjs = [engine.analyze(relations, i, context.descend(index),
                                     info={'class': 'NP'})
                      for i in conj_indices]
             conjs = [c[0] for c in conjs]  # TODO: check if this makes sense.
@@ -136,7 +138,7 @@ class DetRuleset(Ruleset):
                 -> emit((apple, some))
                 -> return None
         """
-        if relations[index].word.lower() in config['NON_EMITTED_DETS']:
+        if relations[index].word.lower() in engine.config['NON_EMITTED_DETS']:
             return relations[index].word
         else:
             # TODO: maybe get the subject from info.
@@ -179,7 +181,8 @@ class AdpmodRuleset(Ruleset):
         # adpobj
         pobj_index = Relation.get_children_with_dep('adpobj', relations, index)
         if pobj_index != []:
-            pobjs = engine.analyze(relations, pobj_index[0], context + [index])
+            pobjs = engine.analyze(relations, pobj_index[0],
+                                   context.descend(index))
 
             emitted_prop_ids = []
             for pobj in pobjs['return_list']:
@@ -198,7 +201,7 @@ class AdpmodRuleset(Ruleset):
                                                      index)
         if pcomp_index != []:
             pcomp = engine.analyze(relations, pcomp_index[0],
-                                   context + [index])['return_value']
+                                   context.descend(index))['return_value']
             if pcomp is not None:
                 engine.emit((relations[index].word + ' ' + pcomp,), 'M')
             # TODO: check the 'else' condition.
@@ -238,7 +241,7 @@ class NumRuleset(Ruleset):
         words = []
         for n in indices:
             if n != index:
-                word = engine.analyze(relations, n, context + [index],
+                word = engine.analyze(relations, n, context.descend(index),
                                       info={'class': 'NP'})
             else:
                 word = relations[index].word
@@ -254,7 +257,7 @@ class NumRuleset(Ruleset):
         advmod_indices = Relation.get_children_with_dep('advmod',
                                                         relations, index)
         for q in advmod_indices:
-            engine.analyze(relations, q, context + [index],
+            engine.analyze(relations, q, context.descend(index),
                            {'num': this_number})
 
         return this_number
@@ -294,10 +297,10 @@ class CompmodRuleset(Ruleset):
         cc_indices = Relation.get_children_with_dep('cc', relations, index)
 
         if cc_indices != []:
-            engine.analyze(relations, cc_indices[0], context + [index])
+            engine.analyze(relations, cc_indices[0], context.descend(index))
             conj_indices = Relation.get_children_with_dep('conj', relations,
                                                           index)
-            conjs = [engine.analyze(relations, i, context + [index],
+            conjs = [engine.analyze(relations, i, context.descend(index),
                                     info={'class': 'NP'})
                      for i in conj_indices]
             conjs = [c[0] for c in conjs]  # TODO: check if this makes sense.
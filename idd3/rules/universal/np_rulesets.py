@@ -35,7 +35,8 @@ class NounPhraseRuleset(Ruleset):
         if det_index == []:
             det = None
         else:
-            det = engine.analyze(relations, det_index[0], context + [index])
+            det = engine.analyze(relations, det_index[0],
+                                 context.descend(index))
 
         return det
 
@@ -48,7 +49,8 @@ class NounPhraseRuleset(Ruleset):
         if poss_index == []:
             poss = None
         else:
-            poss = engine.analyze(relations, poss_index[0], context + [index])
+            poss = engine.analyze(relations, poss_index[0],
+                                  context.descend(index))
 
         return poss
 
@@ -59,7 +61,7 @@ class NounPhraseRuleset(Ruleset):
 
         nnjoin_indices = Relation.get_children_with_dep('compmod-join',
                                                         relations, index)
-        nns = [engine.analyze(relations, i, context + [index])
+        nns = [engine.analyze(relations, i, context.descend(index))
                for i in nnjoin_indices]
 
         return nns
@@ -75,10 +77,10 @@ class NounPhraseRuleset(Ruleset):
             # Consume the cc.
             cc_indices = Relation.get_children_with_dep('cc', relations, index)
             for i in cc_indices:
-                engine.analyze(relations, i, context + [index])
+                engine.analyze(relations, i, context.descend(index))
 
             # Get the conjs.
-            conjs = [engine.analyze(relations, i, context + [index],
+            conjs = [engine.analyze(relations, i, context.descend(index),
                                     info={'class': 'NP'})
                      for i in conj_indices]
             # TODO: check if this makes sense.
@@ -98,7 +100,7 @@ class NounPhraseRuleset(Ruleset):
         prep_indices = Relation.get_children_with_dep('adpmod', relations,
                                                       index)
         for i in prep_indices:
-            engine.analyze(relations, i, context + [index])
+            engine.analyze(relations, i, context.descend(index))
 
     @staticmethod
     def process_modifiers(relations, index, context, engine, info={}):
@@ -112,7 +114,7 @@ class NounPhraseRuleset(Ruleset):
         mods_indices = sorted(amod_indices + num_indices + nn_indices)
         mods = []
         for m in mods_indices:
-            mod = engine.analyze(relations, m, context + [index])
+            mod = engine.analyze(relations, m, context.descend(index))
             if isinstance(mod, str):
                 mods.append(mod)
             elif isinstance(mod, list):
@@ -131,7 +133,7 @@ class NounPhraseRuleset(Ruleset):
                                                          index)
         if preconj_indices != []:
             preconj = engine.analyze(relations, preconj_indices[0],
-                                     context + [index])
+                                     context.descend(index))
         else:
             preconj = None
 
@@ -146,7 +148,7 @@ class NounPhraseRuleset(Ruleset):
         vmod_indices = Relation.get_children_with_dep('vmod', relations,
                                                       index)
         for i in vmod_indices:
-            engine.analyze(relations, i, context + [index],
+            engine.analyze(relations, i, context.descend(index),
                            {'subj': {'return_list': ['NO_SUBJ'],
                                      'rcmod_wdt': None}})
 
@@ -162,7 +164,7 @@ class NounPhraseRuleset(Ruleset):
         wdt = None
         for i in rcmod_indices:
             # _, ids, wdt = engine.analyze(relations, i, context + [index])
-            ret = engine.analyze(relations, i, context + [index], info)
+            ret = engine.analyze(relations, i, context.descend(index), info)
             ids = ret['prop_ids']
             wdt = ret['subjs']
 
@@ -175,7 +177,7 @@ class NounPhraseRuleset(Ruleset):
 
         neg_indices = Relation.get_children_with_dep('neg', relations, index)
         for i in neg_indices:
-            engine.analyze(relations, i, context + [index])
+            engine.analyze(relations, i, context.descend(index))
 
     @staticmethod
     def process_nmods(relations, index, context, engine, info):
@@ -186,7 +188,7 @@ class NounPhraseRuleset(Ruleset):
                                                           index)
 
         for i in npadvmod_indices:
-            mod = engine.analyze(relations, i, context + [index])
+            mod = engine.analyze(relations, i, context.descend(index))
             engine.emit((mod,), 'M')
 
     @staticmethod
@@ -198,7 +200,7 @@ class NounPhraseRuleset(Ruleset):
         advmod_indices = Relation.get_children_with_dep('advmod',
                                                         relations, index)
         for i in advmod_indices:
-            engine.analyze(relations, i, context + [index])
+            engine.analyze(relations, i, context.descend(index))
 
     @staticmethod
     def process_appos(relations, index, context, engine, info):
@@ -208,7 +210,7 @@ class NounPhraseRuleset(Ruleset):
         appos_indices = Relation.get_children_with_dep('appos',
                                                        relations, index)
         for i in appos_indices:
-            engine.analyze(relations, i, context + [index], info)
+            engine.analyze(relations, i, context.descend(index), info)
 
     @staticmethod
     def process_predets(relations, index, context, engine, info):
@@ -218,7 +220,7 @@ class NounPhraseRuleset(Ruleset):
 
         predet_indices = Relation.get_children_with_dep('predet',
                                                         relations, index)
-        predets = [engine.analyze(relations, i, context + [index], info)
+        predets = [engine.analyze(relations, i, context.descend(index), info)
                    for i in predet_indices]
 
         return predets
@@ -496,7 +498,8 @@ class PossRuleset(NounPhraseRuleset):
                 possessive_index = Relation.get_children_with_dep('adp',
                                                                   relations,
                                                                   index)[0]
-                engine.analyze(relations, possessive_index, context + [index])
+                engine.analyze(relations, possessive_index,
+                               context.descend(index))
 
                 referent = relations[context[-1]].word
                 for item in this:
@@ -545,7 +548,7 @@ class NmodRuleset(Ruleset):
             if w == index:
                 word = relations[index].word
             else:
-                word = engine.analyze(relations, w, context + [index])
+                word = engine.analyze(relations, w, context.descend(index))
 
             if isinstance(word, str):
                 words.append(word)
@@ -16,7 +16,7 @@
 # this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from __future__ import print_function, unicode_literals, division
-from idd3 import Relation, Ruleset, config
+from idd3 import Relation, Ruleset
 from idd3.rules.universal.adjp_rulesets import AdjectivalPhraseRuleset
 from idd3.rules.universal.np_rulesets import NounPhraseRuleset
 import logging
@@ -26,6 +26,13 @@ logger = logging.getLogger(__name__)
 
 be_forms = ['am', 'are', 'is', 'being', 'was', 'were', 'been']
 
+# Labels of gerunds that are emitted with their subjects.
+gerund_with_subject_rels = frozenset(['null', 'ROOT', 'conj', 'vmod'])
+# Labels of clausal complements.
+complement_rels = frozenset(['xcomp', 'ccomp', 'adpcomp', 'csubj'])
+# Coarse tags of the heads of copular clauses with noun phrases.
+nominal_ctags = frozenset(['NOUN', 'NUM', 'PRON'])
+
 
 class VerbPhraseRuleset(Ruleset):
 
@@ -47,24 +54,26 @@ class VerbPhraseRuleset(Ruleset):
                 subj = {'return_list': ['(NO_SUBJ)'], 'rcmod_wdt': None}
                 # TODO: remove.
         else:
-            subj = engine.analyze(relations, subj_index[0], context + [index])
+            subj = engine.analyze(relations, subj_index[0],
+                                  context.descend(index))
 
         # nsubjpass
         subj_index = Relation.get_children_with_dep('nsubjpass', relations,
                                                     index)
         if subj_index != []:
-            subj = engine.analyze(relations, subj_index[0], context + [index])
+            subj = engine.analyze(relations, subj_index[0],
+                                  context.descend(index))
 
         # csubj
         subj_index = Relation.get_children_with_dep('csubj', relations, index)
         if subj_index != []:
             subj = {'return_list': [engine.analyze(relations, subj_index[0],
-                                                   context + [index])
+                                                   context.descend(index))
                                     ['return_value']],
                     'rcmod_wdt': None}
 
         # Resolve relative pronouns in subordinate clauses.
-        if subj['return_list'][0] in config['RELATIVE_PRONOUNS']\
+        if subj['return_list'][0] in engine.config['RELATIVE_PRONOUNS']\
                 and 'subj' in info:
             subj['return_list'][0] += '(={0})'.format(
                 info['subj']['return_list'][0])
@@ -80,7 +89,7 @@ class VerbPhraseRuleset(Ruleset):
         auxpass_index = Relation.get_children_with_dep('auxpass', relations,
                                                        index)
         auxs_index = sorted(aux_index + auxpass_index)
-        auxs = [engine.analyze(relations, i, context + [index])
+        auxs = [engine.analyze(relations, i, context.descend(index))
                 for i in auxs_index]
 
         if auxs == [] and 'aux' in info:
@@ -97,7 +106,8 @@ class VerbPhraseRuleset(Ruleset):
         if prt_index == []:
             prt = None
         else:
-            prt = engine.analyze(relations, prt_index[0], context + [index])
+            prt = engine.analyze(relations, prt_index[0],
+                                 context.descend(index))
 
         return prt
 
@@ -114,7 +124,7 @@ class VerbPhraseRuleset(Ruleset):
 
         comps_indices = sorted(dobj_index + xcomp_index + acomp_index +
                                attr_index)
-        _comps = [engine.analyze(relations, i, context + [index], info)
+        _comps = [engine.analyze(relations, i, context.descend(index), info)
                   for i in comps_indices]
 
         comps = []
@@ -140,7 +150,8 @@ class VerbPhraseRuleset(Ruleset):
 
         ccomp_index = Relation.get_children_with_dep('ccomp', relations, index)
         if ccomp_index != []:
-            engine.analyze(relations, ccomp_index[0], context + [index], info)
+            engine.analyze(relations, ccomp_index[0],
+                           context.descend(index), info)
 
     @staticmethod
     def process_iobj(relations, index, context, engine, info):
@@ -151,12 +162,12 @@ class VerbPhraseRuleset(Ruleset):
         prep_indices = Relation.get_children_with_dep('adpmod', relations,
                                                       index)
         for prep_index in prep_indices:
-            engine.analyze(relations, prep_index, context + [index])
+            engine.analyze(relations, prep_index, context.descend(index))
 
         # iobj
         iobj_index = Relation.get_children_with_dep('iobj', relations, index)
         if iobj_index != []:
-            engine.analyze(relations, iobj_index[0], context + [index])
+            engine.analyze(relations, iobj_index[0], context.descend(index))
 
     @staticmethod
     def process_advs(relations, index, context, engine, info):
@@ -167,17 +178,17 @@ class VerbPhraseRuleset(Ruleset):
         advmod_indices = Relation.get_children_with_dep('advmod', relations,
                                                         index)
         for i in advmod_indices:
-            engine.analyze(relations, i, context + [index])
+            engine.analyze(relations, i, context.descend(index))
 
         # tmod
         tmod_indices = Relation.get_children_with_dep('tmod', relations, index)
         for i in tmod_indices:
-            engine.analyze(relations, i, context + [index])
+            engine.analyze(relations, i, context.descend(index))
 
         # neg
         neg_indices = Relation.get_children_with_dep('neg', relations, index)
         for i in neg_indices:
-            engine.analyze(relations, i, context + [index])
+            engine.analyze(relations, i, context.descend(index))
 
     @staticmethod
     def process_ignorables(relations, index, context, engine, info):
@@ -189,13 +200,13 @@ class VerbPhraseRuleset(Ruleset):
         complm_indices = Relation.get_children_with_dep('complm', relations,
                                                         index)
         for i in complm_indices:
-            engine.analyze(relations, i, context + [index])
+            engine.analyze(relations, i, context.descend(index))
 
         # TODO: check if this makes sense.
         # mark
         mark_indices = Relation.get_children_with_dep('mark', relations, index)
         for i in mark_indices:
-            engine.analyze(relations, i, context + [index])
+            engine.analyze(relations, i, context.descend(index))
 
     @staticmethod
     def process_nmods(relations, index, context, engine, info):
@@ -205,7 +216,7 @@ class VerbPhraseRuleset(Ruleset):
         # nmod
         npadvmod_indices = Relation.get_children_with_dep('nmod', relations,
                                                           index)
-        mods = [engine.analyze(relations, i, context + [index])
+        mods = [engine.analyze(relations, i, context.descend(index))
                 for i in npadvmod_indices]
 
         for mod in mods:
@@ -228,8 +239,9 @@ class VerbPhraseRuleset(Ruleset):
             pobj_index = Relation.get_children_with_dep('adpobj', relations,
                                                         prep_index)[0]
 
-            pobj_return_value = engine.analyze(relations, pobj_index, context +
-                                               [index, prep_index])
+            pobj_return_value = engine.analyze(
+                relations, pobj_index,
+                context.descend(index).descend(prep_index))
 
             return_list = []
             for noun in pobj_return_value['return_list']:
@@ -240,7 +252,7 @@ class VerbPhraseRuleset(Ruleset):
             return return_list
         else:
             for prep_index in prep_indices:
-                engine.analyze(relations, prep_index, context + [index])
+                engine.analyze(relations, prep_index, context.descend(index))
             return []
 
     @staticmethod
@@ -258,7 +270,7 @@ class VerbPhraseRuleset(Ruleset):
                 _info = {}
 
             advmod = [engine.analyze(relations, advmod_indices[0],
-                                     context + [index], _info)]
+                                     context.descend(index), _info)]
         else:
             advmod = []
 
@@ -273,7 +285,7 @@ class VerbPhraseRuleset(Ruleset):
                                                            relations, index)
 
         for i in discourse_indices:
-            engine.analyze(relations, i, context + [index])
+            engine.analyze(relations, i, context.descend(index))
 
     @staticmethod
     def process_advcl(relations, index, context, engine, info, prop_ids):
@@ -284,7 +296,7 @@ class VerbPhraseRuleset(Ruleset):
                                                        relations, index)
 
         for i in advcl_indices:
-            ret = engine.analyze(relations, i, context + [index])
+            ret = engine.analyze(relations, i, context.descend(index))
             for p in prop_ids:
                 if ret['marker']:
                     prop = tuple([ret['marker'], p] + ret['prop_ids'])
@@ -304,7 +316,7 @@ class VerbPhraseRuleset(Ruleset):
 
             if cc_indices:
                 conjunction = engine.analyze(relations, cc_indices[0],
-                                             context + [index])
+                                             context.descend(index))
             else:
                 conjunction = None
 
@@ -312,11 +324,11 @@ class VerbPhraseRuleset(Ruleset):
                                                              relations, index)
             if preconj_indices != []:
                 preconj = engine.analyze(relations, preconj_indices[0],
-                                         context + [index])
+                                         context.descend(index))
                 conjunction = preconj + '_' + conjunction
 
             for i in conj_indices:
-                ret = engine.analyze(relations, i, context + [index],
+                ret = engine.analyze(relations, i, context.descend(index),
                                      info={'class': 'VP',
                                            'subj': subjs,
                                            'aux': auxs})
@@ -335,7 +347,7 @@ class VerbPhraseRuleset(Ruleset):
                                                            relations, index)
 
         for i in parataxis_indices:
-            engine.analyze(relations, i, context + [index])
+            engine.analyze(relations, i, context.descend(index))
 
     @staticmethod
     def process_whats(relations, index, context, engine, info):
@@ -345,7 +357,7 @@ class VerbPhraseRuleset(Ruleset):
         what_indices = Relation.get_children_with_dep('what', relations, index)
 
         for i in what_indices:
-            engine.analyze(relations, i, context + [index], info)
+            engine.analyze(relations, i, context.descend(index), info)
 
     @staticmethod
     def process_vmods(relations, index, context, engine, info):
@@ -355,7 +367,7 @@ class VerbPhraseRuleset(Ruleset):
         vmod_indices = Relation.get_children_with_dep('vmod', relations, index)
 
         for i in vmod_indices:
-            engine.analyze(relations, i, context + [index], info)
+            engine.analyze(relations, i, context.descend(index), info)
 
     def emit_propositions(self, verb, subjs, dobjs, engine, relation):
 
@@ -365,8 +377,8 @@ class VerbPhraseRuleset(Ruleset):
 
         # Cannot use ctag here, since we need to know if the verb is in the
         # gerund (the use of the -ing ending is equally English-specific).
-        if relation.tag == 'VBG' and relation.rel not in ('null', 'ROOT',
-                                                          'conj', 'vmod'):
+        if relation.tag == 'VBG' \
+                and relation.rel not in gerund_with_subject_rels:
             if not dobjs:
                     prop_id = engine.emit((verb,), 'P')
                     prop_ids.append(prop_id)
@@ -423,8 +435,9 @@ class VerbPhraseRuleset(Ruleset):
 
         auxs = self.process_auxs(relations, index, context, engine, info)
 
-        verb = ' '.join([word for word in auxs + [relations[index].word]
-                         if word is not None])
+        verb = engine.join_words([word for word in
+                                  auxs + [relations[index].word]
+                                  if word is not None])
 
         # Prepositional modifiers.
         prep_mods = VerbPhraseRuleset.process_pp_when_be_is_root(relations,
@@ -466,10 +479,8 @@ class VerbPhraseRuleset(Ruleset):
                 prop_id = engine.emit((verb, subj), 'P')
                 prop_ids.append(prop_id)
 
-        self.subjs = subjs
-        self.auxs = auxs
-
-        return {'return_value': None, 'prop_ids': prop_ids}
+        return {'return_value': None, 'prop_ids': prop_ids, 'subjs': subjs,
+                'auxs': auxs}
 
     def handle_action_verb(self, relations, index, context, engine, info):
 
@@ -481,8 +492,9 @@ class VerbPhraseRuleset(Ruleset):
 
         prt = self.process_prt(relations, index, context, engine, info)
 
-        verb = ' '.join([word for word in auxs + [relations[index].word, prt]
-                         if word is not None])
+        verb = engine.join_words([word for word in
+                                  auxs + [relations[index].word, prt]
+                                  if word is not None])
 
         comps = self.process_comps(relations, index, context, engine,
                                    {'subj': subjs})
@@ -500,26 +512,21 @@ class VerbPhraseRuleset(Ruleset):
 
         self.process_vmods(relations, index, context, engine, info)
 
-        self.subjs = subjs
-        self.auxs = auxs
-
         # Emit propositions.
         prop_ids = []
-        if relations[index].rel in ('xcomp', 'ccomp', 'adpcomp', 'csubj'):
-            if relations[index].tag in config['GERUND_TAGS']:
-                if comps != []:
-                    prop_ids = self.emit_propositions(verb, subjs, comps,
-                                                      engine, relations[index])
-                return {'return_value': relations[index].word,
-                        'prop_ids': prop_ids}
-            else:
-                prop_ids = self.emit_propositions(verb, subjs, comps, engine,
-                                                  relations[index])
-                return {'return_value': None, 'prop_ids': prop_ids}
+        return_value = None
+        if relations[index].rel in complement_rels and \
+                relations[index].tag in engine.config['GERUND_TAGS']:
+            if comps != []:
+                prop_ids = self.emit_propositions(verb, subjs, comps,
+                                                  engine, relations[index])
+            return_value = relations[index].word
         else:
             prop_ids = self.emit_propositions(verb, subjs, comps, engine,
                                               relations[index])
-            return {'return_value': None, 'prop_ids': prop_ids}
+
+        return {'return_value': return_value, 'prop_ids': prop_ids,
+                'subjs': subjs, 'auxs': auxs}
 
     def handle_cop_with_np(self, relations, index, context, engine, info):
 
@@ -528,11 +535,12 @@ class VerbPhraseRuleset(Ruleset):
         subjs = self.process_subj(relations, index, context, engine, info)
 
         cop_index = Relation.get_children_with_dep('cop', relations, index)[0]
-        cop = engine.analyze(relations, cop_index, context + [index])
+        cop = engine.analyze(relations, cop_index, context.descend(index))
 
         auxs = self.process_auxs(relations, index, context, engine, info)
 
-        verb = ' '.join([word for word in auxs + [cop] if word is not None])
+        verb = engine.join_words([word for word in auxs + [cop]
+                                  if word is not None])
 
         self.process_ignorables(relations, index, context, engine, info)
 
@@ -549,10 +557,8 @@ class VerbPhraseRuleset(Ruleset):
                 prop_id = engine.emit((verb, subj, compl), 'P')
                 prop_ids.append(prop_id)
 
-        self.subjs = subjs
-        self.auxs = auxs
-
-        return {'return_value': None, 'prop_ids': prop_ids, 'this': this}
+        return {'return_value': None, 'prop_ids': prop_ids, 'subjs': subjs,
+                'auxs': auxs, 'this': this}
 
     def handle_cop_with_adjp(self, relations, index, context, engine, info):
 
@@ -561,11 +567,12 @@ class VerbPhraseRuleset(Ruleset):
         subjs = self.process_subj(relations, index, context, engine, info)
 
         cop_index = Relation.get_children_with_dep('cop', relations, index)[0]
-        cop = engine.analyze(relations, cop_index, context + [index])
+        cop = engine.analyze(relations, cop_index, context.descend(index))
 
         auxs = self.process_auxs(relations, index, context, engine, info)
 
-        verb = ' '.join([word for word in auxs + [cop] if word is not None])
+        verb = engine.join_words([word for word in auxs + [cop]
+                                  if word is not None])
 
         self.process_ignorables(relations, index, context, engine, info)
 
@@ -580,10 +587,8 @@ class VerbPhraseRuleset(Ruleset):
                 prop_id = engine.emit((verb, subj, word), 'P')
                 prop_ids.append(prop_id)
 
-        self.subjs = subjs
-        self.auxs = auxs
-
-        return {'return_value': None, 'prop_ids': prop_ids}
+        return {'return_value': None, 'prop_ids': prop_ids, 'subjs': subjs,
+                'auxs': auxs}
 
     def extract(self, relations, index, context, engine, info={}):
         # Process discourse markers.
@@ -599,7 +604,7 @@ class VerbPhraseRuleset(Ruleset):
                                                   engine, info)
         # elif relations[index].tag in ('NN', 'NNS', 'NNP', 'NNPS', 'CD', 'WP',
         #                               'PRP'):
-        elif relations[index].ctag in ('NOUN', 'NUM', 'PRON'):
+        elif relations[index].ctag in nominal_ctags:
             return_dict = self.handle_cop_with_np(relations, index, context,
                                                   engine, info)
         # elif relations[index].tag in ('JJ'):
@@ -616,7 +621,8 @@ class VerbPhraseRuleset(Ruleset):
 
         # Process conjunctions.
         VerbPhraseRuleset.process_conjs(relations, index, context, engine,
-                                        info, self.subjs, self.auxs,
+                                        info, return_dict['subjs'],
+                                        return_dict['auxs'],
                                         return_dict['prop_ids'])
 
         # Process parataxical clauses.
@@ -626,8 +632,6 @@ class VerbPhraseRuleset(Ruleset):
         # Process ignorable elements.
         self.process_ignorables(relations, index, context, engine, info)
 
-        return_dict['subjs'] = self.subjs
-
         # Process rcmods.
         VerbPhraseRuleset.emit_propositions_rcmods(return_dict, engine)
 
@@ -689,7 +693,8 @@ class AdvclRuleset(VerbPhraseRuleset):
         mark_index = Relation.get_children_with_dep('mark', relations, index)
 
         if mark_index != []:
-            marker = engine.analyze(relations, mark_index[0], context + [index])
+            marker = engine.analyze(relations, mark_index[0],
+                                    context.descend(index))
         else:
             marker = None
 
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+# IDD3 - Propositional Idea Density from Dependency Trees
+# Copyright (C) 2014-2015  Andre Luiz Verucci da Cunha
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import print_function, unicode_literals, division
+from collections import defaultdict, deque
+import io
+import json
+import threading
+
+
+class Sink(object):
+
+    """Receives the propositions of an Engine as they are emitted (see
+        Engine.__init__), along with the ID of their sentence, i.e., its
+        position (starting at 0) among the sentences analyzed by the engine.
+        In count-only mode, propositions have no content.
+
+        Once the analysis of a sentence is done, the sink is told whether it
+        ended (end_sentence) or failed (abort_sentence), in which case the
+        propositions it got for that sentence are only part of them.
+
+        An engine may be used by several threads at once, so sinks must be
+        thread-safe.
+    """
+
+    def emit(self, sentence_id, prop):
+        """Receive a proposition.
+
+        :sentence_id: the ID of the sentence.
+        :prop: the Proposition.
+        """
+        raise NotImplementedError
+
+    def end_sentence(self, sentence_id):
+        """Called once the analysis of a sentence is done.
+
+        :sentence_id: the ID of the sentence.
+        """
+        pass
+
+    def abort_sentence(self, sentence_id, error):
+        """Called when the analysis of a sentence fails, instead of
+            end_sentence.
+
+        :sentence_id: the ID of the sentence.
+        :error: the exception raised by the analysis.
+        """
+        pass
+
+    def close(self):
+        """Release the resources of the sink."""
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CallbackSink(Sink):
+
+    """Calls a function with each proposition."""
+
+    def __init__(self, emit, end_sentence=None, abort_sentence=None):
+        """Form a sink.
+
+        :emit: a function called with the ID of the sentence and each
+            Proposition.
+        :end_sentence: a function called with the ID of each sentence once
+            its analysis is done.
+        :abort_sentence: a function called with the ID of each sentence
+            whose analysis fails, and the exception.
+        """
+        self._emit = emit
+        self._end_sentence = end_sentence
+        self._abort_sentence = abort_sentence
+
+    def emit(self, sentence_id, prop):
+        self._emit(sentence_id, prop)
+
+    def end_sentence(self, sentence_id):
+        if self._end_sentence is not None:
+            self._end_sentence(sentence_id)
+
+    def abort_sentence(self, sentence_id, error):
+        if self._abort_sentence is not None:
+            self._abort_sentence(sentence_id, error)
+
+
+class TeeSink(Sink):
+
+    """Passes each proposition on to several sinks."""
+
+    def __init__(self, *sinks):
+        """Form a sink.
+
+        :sinks: the sinks to pass propositions to.
+        """
+        self.sinks = sinks
+
+    def emit(self, sentence_id, prop):
+        for sink in self.sinks:
+            sink.emit(sentence_id, prop)
+
+    def end_sentence(self, sentence_id):
+        for sink in self.sinks:
+            sink.end_sentence(sentence_id)
+
+    def abort_sentence(self, sentence_id, error):
+        for sink in self.sinks:
+            sink.abort_sentence(sentence_id, error)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+class CountingSink(Sink):
+
+    """Counts the propositions of each kind, and the sentences. The
+        propositions of a sentence are counted once its analysis ends; those
+        of the sentences whose analysis fails are left out, and the
+        sentences are counted in 'failed'."""
+
+    def __init__(self):
+        # Kind -> number of propositions.
+        self.counts = defaultdict(int)
+        self.sentences = 0
+        self.failed = 0
+        # Sentence ID -> the counts of a sentence still being analyzed.
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def emit(self, sentence_id, prop):
+        with self._lock:
+            counts = self._pending.setdefault(sentence_id, defaultdict(int))
+            counts[prop.kind] += 1
+
+    def end_sentence(self, sentence_id):
+        with self._lock:
+            for kind, count in self._pending.pop(sentence_id, {}).items():
+                self.counts[kind] += count
+            self.sentences += 1
+
+    def abort_sentence(self, sentence_id, error):
+        with self._lock:
+            self._pending.pop(sentence_id, None)
+            self.failed += 1
+
+    @property
+    def total(self):
+        """The number of propositions."""
+        return sum(self.counts.values())
+
+
+class BufferSink(Sink):
+
+    """Keeps the most recent propositions, as (sentence ID, proposition)
+        pairs, in a bounded buffer; older ones are dropped as new ones
+        arrive."""
+
+    def __init__(self, maxlen=1024):
+        """Form a sink.
+
+        :maxlen: the maximum number of propositions kept.
+        """
+        self.buffer = deque(maxlen=maxlen)
+
+    def emit(self, sentence_id, prop):
+        self.buffer.append((sentence_id, prop))
+
+    def drain(self):
+        """Remove and return the propositions in the buffer, oldest first."""
+        items = []
+        while True:
+            try:
+                items.append(self.buffer.popleft())
+            except IndexError:
+                return items
+
+
+class FileSink(Sink):
+
+    """Writes each proposition as a line of JSON, with the keys 'sentence'
+        (the ID of the sentence), 'kind', 'content' (a list, or null in
+        count-only mode) and 'index' (see Proposition.__init__). When the
+        analysis of a sentence fails, it writes a line with the keys
+        'sentence' and 'error' (the name of the exception and its message)
+        instead."""
+
+    def __init__(self, output):
+        """Form a sink.
+
+        :output: a path, or a file opened for writing text.
+        """
+        if hasattr(output, 'write'):
+            self.file = output
+            self._owns_file = False
+        else:
+            self.file = io.open(output, 'w', encoding='utf-8')
+            self._owns_file = True
+
+        self._lock = threading.Lock()
+
+    def emit(self, sentence_id, prop):
+        line = json.dumps({'sentence': sentence_id, 'kind': prop.kind,
+                           'content': None if prop.content is None
+                           else list(prop.content),
+                           'index': prop.index},
+                          sort_keys=True)
+        with self._lock:
+            self.file.write(line + '\n')
+
+    def abort_sentence(self, sentence_id, error):
+        line = json.dumps({'sentence': sentence_id,
+                           'error': '{0}: {1}'.format(
+                               error.__class__.__name__, error)},
+                          sort_keys=True)
+        with self._lock:
+            self.file.write(line + '\n')
+
+    def close(self):
+        """Close the output file, if it was opened by the sink."""
+        if self._owns_file:
+            self.file.close()
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+# IDD3 - Propositional Idea Density from Dependency Trees
+# Copyright (C) 2014-2015  Andre Luiz Verucci da Cunha
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import print_function, unicode_literals, division
+import io
+import json
+
+
+class Tracer(object):
+
+    """Writes a trace of the analysis of each sentence given to an Engine
+        (see Engine.__init__) as a line of JSON, with the keys:
+
+        sentence: the ID of the sentence, i.e., its position (starting at 0)
+            among the sentences analyzed with this tracer.
+        tree: the relations after the transformations, as lists of address,
+            word, tag, ctag, head and label.
+        dispatch: the ruleset calls, in order, as lists of the index and
+            label of the relation, the name of the ruleset, and the index of
+            the caller (-1 for the TOP relation).
+        propositions: the emitted propositions, as lists of content, kind
+            and the index of the relation that emitted them.
+        cached: whether the result came from the engine's cache (in which
+            case there are no ruleset calls).
+    """
+
+    def __init__(self, output, sentence_ids=None):
+        """Form a tracer.
+
+        :output: a path, or a file opened for writing text.
+        :sentence_ids: the IDs of the sentences to trace (all of them, by
+            default).
+        """
+        if hasattr(output, 'write'):
+            self.file = output
+            self._owns_file = False
+        else:
+            self.file = io.open(output, 'w', encoding='utf-8')
+            self._owns_file = True
+
+        self.sentence_ids = None if sentence_ids is None \
+            else frozenset(sentence_ids)
+        self.next_id = 0
+
+    def begin(self):
+        """Start a sentence.
+
+        :returns: the trace of the sentence (a dictionary), or None if it
+            shouldn't be traced.
+        """
+        sentence_id = self.next_id
+        self.next_id += 1
+
+        if self.sentence_ids is not None and \
+                sentence_id not in self.sentence_ids:
+            return None
+
+        return {'sentence': sentence_id, 'dispatch': [], 'cached': False}
+
+    @staticmethod
+    def tree(relations):
+        """Describe the relations of a sentence (see the class docstring)."""
+        return [[relation.address, relation.word, relation.tag,
+                 relation.ctag, relation.head, relation.rel]
+                for relation in relations]
+
+    def end(self, trace, relations, props):
+        """Finish a sentence, writing its trace.
+
+        :trace: the trace returned by begin.
+        :relations: the relations of the sentence.
+        :props: the propositions emitted.
+        """
+        if 'tree' not in trace:
+            trace['tree'] = self.tree(relations)
+        trace['propositions'] = [[list(prop.content), prop.kind, prop.index]
+                                 for prop in props]
+
+        self.file.write(json.dumps(trace, sort_keys=True) + '\n')
+
+    def close(self):
+        """Close the output file, if it was opened by the tracer."""
+        if self._owns_file:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
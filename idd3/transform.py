@@ -14,7 +14,7 @@
 #
 # You should have received a copy of the GNU General Public License along with
 # this program.  If not, see <http://www.gnu.org/licenses/>.
-from idd3.base import Transformation
+from idd3.base import Relation, Transformation
 
 
 def delete_indices(relations, indices):
@@ -26,34 +26,116 @@ def delete_indices(relations, indices):
     :indices: the indices of the relations to remove.
 
     """
-    indices = sorted(indices, reverse=True)
+    Relation.clear_children_index(relations)
 
+    removed = [False] * len(relations)
     for index in indices:
-        del relations[index]
+        removed[index] = True
 
-        for rel in relations:
-            if rel.head is not None:
-                if rel.head >= index:
-                    rel.head -= 1
+    # Each head is shifted by the number of removed relations up to (and
+    #   including) it.
+    shifts = []
+    shift = 0
+    for is_removed in removed:
+        if is_removed:
+            shift += 1
+        shifts.append(shift)
+
+    relations[:] = [rel for i, rel in enumerate(relations) if not removed[i]]
 
     for i, rel in enumerate(relations):
         rel.address = i
         rel.deps = []
+        if rel.head is not None:
+            rel.head -= shifts[rel.head]
 
     for i, rel in enumerate(relations):
         if rel.head is not None:
             relations[rel.head].deps.append(i)
 
-    for rel in relations:
-        rel.deps.sort()
-
 
 class RemovePunctuation(Transformation):
     """Removes punct relations."""
 
+    trigger_rels = ('p',)
+    normalizes = True
+
     def transform(self, relations):
         indices_to_remove = []
         for i, relation in enumerate(relations):
             if relation.rel == 'p':
                 indices_to_remove.append(i)
         delete_indices(relations, indices_to_remove)
+
+
+class FusedTransformation(Transformation):
+    """Applies a sequence of transformations, producing the same tree as
+        applying them one after the other. A single scan over the sentence
+        first finds the earliest transformation that matches some position;
+        the ones before it would leave the tree untouched, and are
+        skipped."""
+
+    def __init__(self, transformations):
+        self.transformations = transformations
+
+        self._always = len(transformations)
+        self._by_word = {}
+        self._by_tag = {}
+        self._by_rel = {}
+
+        for k, transformation in enumerate(transformations):
+            if transformation.trigger_words is None\
+                    and transformation.trigger_tags is None\
+                    and transformation.trigger_rels is None:
+                self._always = min(self._always, k)
+                continue
+
+            for triggers, values in ((self._by_word,
+                                      transformation.trigger_words),
+                                     (self._by_tag,
+                                      transformation.trigger_tags),
+                                     (self._by_rel,
+                                      transformation.trigger_rels)):
+                for value in values or ():
+                    triggers.setdefault(value, []).append(k)
+
+        self.normalizes = any(transformation.normalizes
+                              for transformation in transformations)
+
+    def find_first_match(self, relations):
+        """Find the earliest transformation that may change the tree.
+
+        :relations: the list of relations in a sentence.
+        :returns: its index in self.transformations, or the number of
+            transformations if none of them matches.
+        """
+        first = self._always
+
+        for index, relation in enumerate(relations):
+            word = relation.word.lower() if relation.word else None
+
+            for candidates in (self._by_word.get(word, ()),
+                               self._by_tag.get(relation.tag, ()),
+                               self._by_rel.get(relation.rel, ())):
+                for k in candidates:
+                    if k >= first:
+                        break
+                    if self.transformations[k].matches(relations, index):
+                        first = k
+                        break
+
+            if first == 0:
+                break
+
+        return first
+
+    def transform(self, relations):
+        first = self.find_first_match(relations)
+
+        # Skipped transformations may still have renumbered the tree.
+        if any(transformation.normalizes
+               for transformation in self.transformations[:first]):
+            delete_indices(relations, [])
+
+        for transformation in self.transformations[first:]:
+            transformation.transform(relations)
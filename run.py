@@ -18,9 +18,9 @@
 from __future__ import print_function, unicode_literals, division
 
 import idd3
-from idd3 import Relation, Engine
+from idd3 import Engine
 from idd3.rules import en, pt
-import nltk
+from idd3.conll import read_conll
 from sys import argv
 from collections import defaultdict
 from idd3.parsers import StanfordUnivDepParser, StanfordParser
@@ -54,30 +54,27 @@ stanford_path = os.path.expanduser('~') + \
     "/Develop/stanford_tools/stanford-parser"
 
 
-def get_sentence(graph):
-    """Turns a graph into a list of words.
+def get_sentence(relations):
+    """Turns a list of relations into a list of words.
     """
-    return ' '.join([node['word']
-                     for node in graph.nodes.values() if node['word']])
+    return ' '.join([relation.word
+                     for relation in relations if relation.word])
 
 
-def process_graphs(graphs):
+def process_sentences(sentences):
     engine = Engine(idd3.all_rulesets, idd3.all_transformations)
     stats = defaultdict(int)
 
-    for index in range(len(graphs)):
+    for index, relations in enumerate(sentences):
         print('-' * int(columns))
-        relations = []
-        for relation in graphs[index].nodes.values():
-            relations.append(Relation(**relation))
 
         print(colored('Sentence %d:' % (index + 1), 'white', attrs=['bold']))
-        print('\t' + get_sentence(graphs[index]))
+        print('\t' + get_sentence(relations))
 
         print(colored('Propositions:', 'white', attrs=['bold']))
         try:
-            engine.analyze(relations)
-            for i, prop in enumerate(engine.props):
+            props = engine.analyze(relations)
+            for i, prop in enumerate(props):
                 print(str(i + 1) + ' ' + str(prop))
                 stats[prop.kind] += 1
         except Exception as e:
@@ -103,7 +100,7 @@ def main():
         return
 
     if argv[1].endswith('.conll'):
-        graphs = nltk.parse.dependencygraph.DependencyGraph.load(argv[1])
+        sentences = read_conll(argv[1])
     else:
         parser = StanfordUnivDepParser(corenlp_path, model_path,
                                        pos_mapping_file)
@@ -111,9 +108,9 @@ def main():
         # Uncomment for normalized Stanford Parser.
         # parser = StanfordParser(stanford_path, pos_mapping_file)
 
-        graphs = parser.parse_raw_file(argv[1])
+        sentences = parser.iter_parse_raw_file(argv[1])
 
-    stats = process_graphs(graphs)
+    stats = process_sentences(sentences)
     print_stats(stats)
 
 
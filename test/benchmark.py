@@ -0,0 +1,374 @@
+# -*- coding: utf-8 -*-
+# IDD3 - Propositional Idea Density from Dependency Trees
+# Copyright (C) 2014-2015  Andre Luiz Verucci da Cunha
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Benchmarks idd3 on the bundled corpus, for each language and for three
+    kinds of run: transformations only, engine only (on already transformed
+    sentences), and end to end (reading the CoNLL lines, transforming and
+    analyzing). For each one, it measures the throughput (sentences per
+    second, from the fastest repetition), the percentiles of the fastest
+    latency of each sentence, and the peak memory allocated while running
+    (where tracemalloc exists).
+
+    The results are compared to a baseline file, and the exit status is 1 if
+    any of them got worse by more than the tolerance. Baselines depend on the
+    machine, so update them (with --update) before comparing changes on a
+    new one.
+
+    With --scaling, it runs the English benchmarks on synthetic sentences
+    of increasing length instead (see synthetic.py), and reports words per
+    second for each length: if it drops as sentences grow, some step is
+    superlinear. --plot draws the throughput against the length, if
+    matplotlib is installed.
+
+    Usage: python benchmark.py [--update] [--repeat N] [--tolerance T]
+           python benchmark.py --scaling [--lengths L,L,...] [--plot PATH]
+"""
+
+from __future__ import print_function, unicode_literals, division
+
+import argparse
+from importlib import import_module
+import io
+import json
+import logging
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+import idd3
+from idd3.base import timer
+from idd3.conll import iter_sentences
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+CORPUS = os.path.join(HERE, 'corpus.norm.conll')
+BASELINE = os.path.join(HERE, 'benchmark_baseline.json')
+LANGUAGES = ('en', 'pt')
+MODES = ('transform', 'engine', 'end-to-end')
+
+
+def read_blocks(path):
+    """Read the lines of each sentence of a CoNLL file."""
+    blocks = [[]]
+    with io.open(path, encoding='utf-8') as conll_file:
+        for line in conll_file:
+            if line.strip():
+                blocks[-1].append(line)
+            elif blocks[-1]:
+                blocks.append([])
+
+    return [block for block in blocks if block]
+
+
+def parse_block(block):
+    return next(iter_sentences(block))
+
+
+def analyze(engine, relations):
+    # Some sentences are beyond the rulesets of a language; they still take
+    #   time, so they are measured like the others.
+    try:
+        engine.analyze(relations)
+    except Exception:
+        pass
+
+
+def prepare_transform(blocks):
+    return [parse_block(block) for block in blocks]
+
+
+def run_transform(sentences):
+    """Time the transformations of each sentence."""
+    latencies = []
+    for relations in sentences:
+        start = timer()
+        for transformation in idd3.all_transformations:
+            transformation.transform(relations)
+        latencies.append(timer() - start)
+
+    return latencies
+
+
+def prepare_engine(blocks):
+    sentences = [parse_block(block) for block in blocks]
+    for relations in sentences:
+        for transformation in idd3.all_transformations:
+            transformation.transform(relations)
+
+    return sentences
+
+
+def run_engine(sentences):
+    """Time the analysis of each (already transformed) sentence."""
+    engine = idd3.Engine(idd3.all_rulesets, [])
+
+    latencies = []
+    for relations in sentences:
+        start = timer()
+        analyze(engine, relations)
+        latencies.append(timer() - start)
+
+    return latencies
+
+
+def prepare_end_to_end(blocks):
+    return blocks
+
+
+def run_end_to_end(blocks):
+    """Time reading, transforming and analyzing each sentence."""
+    engine = idd3.Engine(idd3.all_rulesets, idd3.all_transformations)
+
+    latencies = []
+    for block in blocks:
+        start = timer()
+        analyze(engine, parse_block(block))
+        latencies.append(timer() - start)
+
+    return latencies
+
+
+# Mode -> (function that builds the input, untimed; function that runs the
+#   benchmark on it and returns the latency of each sentence).
+RUNS = {'transform': (prepare_transform, run_transform),
+        'engine': (prepare_engine, run_engine),
+        'end-to-end': (prepare_end_to_end, run_end_to_end)}
+
+
+def percentile(values, fraction):
+    """Return the value below which a fraction of the (sorted) values are,
+        by linear interpolation."""
+    position = (len(values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * \
+        (position - lower)
+
+
+def measure(mode, blocks, repeat):
+    """Run a benchmark several times and summarize it.
+
+    :returns: a dictionary of measurements (see the module docstring).
+    """
+    prepare, run = RUNS[mode]
+
+    # A first, untimed run warms the caches up. Then, to filter out noise
+    #   from the machine, each sentence keeps its fastest latency.
+    run(prepare(blocks))
+    totals = []
+    latencies = None
+    for i in range(repeat):
+        run_latencies = run(prepare(blocks))
+        totals.append(sum(run_latencies))
+        latencies = run_latencies if latencies is None else \
+            [min(old, new) for old, new in zip(latencies, run_latencies)]
+    latencies.sort()
+
+    result = {'sentences_per_second': len(blocks) / min(totals),
+              'p50_ms': percentile(latencies, 0.5) * 1e3,
+              'p90_ms': percentile(latencies, 0.9) * 1e3,
+              'p99_ms': percentile(latencies, 0.99) * 1e3,
+              'peak_kb': None}
+
+    # Tracing slows everything down, so memory is measured in its own run.
+    if tracemalloc is not None:
+        data = prepare(blocks)
+        tracemalloc.start()
+        run(data)
+        result['peak_kb'] = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+
+    return result
+
+
+def run_all(repeat):
+    blocks = read_blocks(CORPUS)
+
+    results = {}
+    for language in LANGUAGES:
+        idd3.use_language(import_module('idd3.rules.' + language))
+        for mode in MODES:
+            results[language + '/' + mode] = measure(mode, blocks, repeat)
+
+    return results
+
+
+def run_scaling(lengths, count, repeat, seed):
+    """Run the English benchmarks on synthetic sentences.
+
+    :returns: a list of (length, words per sentence, results by mode).
+    """
+    from synthetic import TreeGenerator
+
+    idd3.use_language(import_module('idd3.rules.en'))
+
+    scaling = []
+    for length in lengths:
+        generator = TreeGenerator(seed=seed, length=length,
+                                  depth=max(2, length // 10))
+        blocks = [generator.conll_lines() for i in range(count)]
+        words = sum(len(block) for block in blocks) / len(blocks)
+
+        results = dict((mode, measure(mode, blocks, repeat))
+                       for mode in MODES)
+        scaling.append((length, words, results))
+
+    return scaling
+
+
+def print_scaling(scaling):
+    print('{0:>8} {1:>8}'.format('length', 'words') +
+          ''.join(' {0:>18}'.format(mode + ' words/s') for mode in MODES))
+    for length, words, results in scaling:
+        print('{0:>8} {1:>8.1f}'.format(length, words) +
+              ''.join(' {0:>18.0f}'.format(
+                  results[mode]['sentences_per_second'] * words)
+                  for mode in MODES))
+
+
+def plot_scaling(scaling, path):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    words = [row[1] for row in scaling]
+    for mode in MODES:
+        plt.plot(words, [results[mode]['sentences_per_second'] * row_words
+                         for _, row_words, results in scaling],
+                 marker='o', label=mode)
+    plt.xscale('log')
+    plt.xlabel('words per sentence')
+    plt.ylabel('words per second')
+    plt.legend()
+    plt.savefig(path)
+
+
+def compare(results, baseline, tolerance):
+    """Compare results to a baseline.
+
+    :returns: a list of descriptions of the regressions.
+    """
+    # Metric -> whether higher values are better. With a corpus this small,
+    #   p99 is too noisy to be compared.
+    metrics = (('sentences_per_second', True), ('p50_ms', False),
+               ('p90_ms', False), ('peak_kb', False))
+
+    regressions = []
+    for name in sorted(results):
+        if name not in baseline:
+            continue
+        for metric, higher_is_better in metrics:
+            old = baseline[name].get(metric)
+            new = results[name][metric]
+            if not old or new is None:
+                continue
+
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append('{0} {1}: {2:.4g} -> {3:.4g} ({4:+.0%})'
+                                   .format(name, metric, old, new, change))
+
+    return regressions
+
+
+def print_results(results, baseline):
+    print('{0:<16} {1:>12} {2:>9} {3:>9} {4:>9} {5:>10}'.format(
+        'benchmark', 'sentences/s', 'p50 ms', 'p90 ms', 'p99 ms', 'peak KB'))
+    for name in sorted(results):
+        result = results[name]
+        print('{0:<16} {1:>12.1f} {2:>9.3f} {3:>9.3f} {4:>9.3f} {5:>10}'
+              .format(name, result['sentences_per_second'],
+                      result['p50_ms'], result['p90_ms'], result['p99_ms'],
+                      '-' if result['peak_kb'] is None
+                      else '{0:.0f}'.format(result['peak_kb'])), end='')
+        if name in baseline:
+            old = baseline[name]['sentences_per_second']
+            print('   ({0:+.0%} throughput)'.format(
+                (result['sentences_per_second'] - old) / old), end='')
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark idd3.')
+    parser.add_argument('--update', action='store_true',
+                        help='store the results as the new baseline')
+    parser.add_argument('--repeat', type=int, default=10,
+                        help='repetitions of each benchmark (default: 10)')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='relative change accepted before flagging a '
+                        'regression (default: 0.2)')
+    parser.add_argument('--baseline', default=BASELINE,
+                        help='the baseline file')
+    parser.add_argument('--scaling', action='store_true',
+                        help='benchmark synthetic sentences of increasing '
+                        'length')
+    parser.add_argument('--lengths', default='10,20,40,80,160,320',
+                        help='the lengths of the synthetic sentences')
+    parser.add_argument('--sentences', type=int, default=50,
+                        help='synthetic sentences per length (default: 50)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the synthetic sentences')
+    parser.add_argument('--plot', help='plot the scaling results to a file')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    if args.plot:
+        try:
+            import matplotlib
+        except ImportError:
+            parser.error('--plot needs matplotlib.')
+
+    if args.scaling:
+        lengths = [int(length) for length in args.lengths.split(',')]
+        scaling = run_scaling(lengths, args.sentences, args.repeat,
+                              args.seed)
+        print_scaling(scaling)
+        if args.plot:
+            plot_scaling(scaling, args.plot)
+        return 0
+
+    results = run_all(args.repeat)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with io.open(args.baseline, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+
+    print_results(results, baseline)
+
+    if args.update:
+        with io.open(args.baseline, 'w', encoding='utf-8') as baseline_file:
+            baseline_file.write(json.dumps(results, indent=2, sort_keys=True)
+                                + '\n')
+        print('Baseline written to {0}.'.format(args.baseline))
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print('REGRESSION: ' + regression)
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
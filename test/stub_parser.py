@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+# IDD3 - Propositional Idea Density from Dependency Trees
+# Copyright (C) 2014-2015  Andre Luiz Verucci da Cunha
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""A stand-in for a parser worker process (see idd3.parsers.ParserWorker):
+    reads one sentence per line, and writes a flat tree for each of them, in
+    which every word is a noun that depends on the first one, using the
+    CoNLL columns CoreNLP writes (index, word, lemma, tag, NER tag, head,
+    and label).
+
+    With the --shell option, it behaves like CoreNLP's interactive shell:
+    it writes a prompt before reading each sentence, and quits on a line
+    that is exactly 'q', 'quit' or 'exit', in any case."""
+
+from __future__ import print_function, unicode_literals, division
+
+import sys
+
+
+def main():
+    shell = '--shell' in sys.argv[1:]
+
+    while True:
+        if shell:
+            sys.stdout.write('NLP> ')
+            sys.stdout.flush()
+
+        line = sys.stdin.readline()
+        if not line or shell and line.rstrip('\n').lower() in ('q', 'quit',
+                                                                'exit'):
+            break
+
+        for i, word in enumerate(line.split(), 1):
+            head, rel = (0, 'ROOT') if i == 1 else (1, 'dep')
+            print('\t'.join([str(i), word, word.lower(), 'NN', 'O',
+                             str(head), rel]))
+        print()
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+# IDD3 - Propositional Idea Density from Dependency Trees
+# Copyright (C) 2014-2015  Andre Luiz Verucci da Cunha
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Generates random, normalized English dependency trees, for benchmarking
+    idd3 on sentences of any size. Trees are built from clauses (with
+    subjects, objects, prepositional phrases, adverbs, complement and
+    adverbial clauses, and coordination) and noun phrases (with
+    determiners, adjectives, prepositional phrases, relative clauses and
+    coordination), using the labels and tags of the bundled corpus. The same
+    seed always gives the same trees.
+
+    Usage: python synthetic.py OUTPUT [--sentences N] [--length L]
+        [--depth D] [--branching B] [--seed S]
+"""
+
+from __future__ import print_function, unicode_literals, division
+
+import argparse
+import io
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..'))
+
+from idd3.conll import iter_sentences
+
+NOUNS = ('cat', 'dog', 'house', 'man', 'woman', 'park', 'city', 'book',
+         'car', 'tree', 'friend', 'school')
+VERBS = ('saw', 'liked', 'found', 'wanted', 'took', 'made', 'gave', 'knew')
+ADJECTIVES = ('big', 'small', 'old', 'new', 'red', 'happy')
+ADVERBS = ('quickly', 'often', 'really', 'always')
+PREPOSITIONS = ('in', 'on', 'near', 'with', 'from', 'behind')
+DETERMINERS = ('the', 'a', 'this')
+MARKERS = ('because', 'when', 'while')
+
+
+class _Node(object):
+
+    """A word of a tree being generated, with its dependents on each
+        side."""
+
+    def __init__(self, word, ctag, tag, rel):
+        self.word = word
+        self.ctag = ctag
+        self.tag = tag
+        self.rel = rel
+        self.left = []
+        self.right = []
+        # Rulesets expect at most one complement clause and one coordinating
+        #   conjunction per head.
+        self.has_ccomp = False
+        self.has_cc = False
+
+
+class TreeGenerator(object):
+
+    """Generates random dependency trees."""
+
+    def __init__(self, seed=0, length=20, depth=4, branching=2):
+        """Form a generator.
+
+        :seed: the seed of the random number generator.
+        :length: the approximate number of words of each sentence (sentences
+            stop growing once they reach it, so they may be a few words
+            longer).
+        :depth: the maximum number of nested phrases.
+        :branching: the maximum number of optional dependents (beyond
+            subjects, objects and determiners) of each clause or phrase.
+        """
+        self.random = random.Random(seed)
+        self.length = length
+        self.depth = depth
+        self.branching = branching
+        self._remaining = 0
+
+    def _node(self, words, ctag, tag, rel):
+        self._remaining -= 1
+        return _Node(self.random.choice(words), ctag, tag, rel)
+
+    def _modifier_count(self):
+        return self.random.randint(0, self.branching)
+
+    def _add_cc(self, node, words):
+        if not node.has_cc:
+            node.has_cc = True
+            node.right.append(self._node(words, 'CONJ', 'CC', 'cc'))
+
+    def _prepositional_phrase(self, depth, rel='adpmod'):
+        node = self._node(PREPOSITIONS, 'ADP', 'IN', rel)
+        node.right.append(self._noun_phrase(depth - 1, 'adpobj'))
+        return node
+
+    def _noun_phrase(self, depth, rel):
+        node = self._node(NOUNS, 'NOUN', 'NN', rel)
+        if self.random.random() < 0.3:
+            node.left.append(self._node(ADJECTIVES, 'ADJ', 'JJ', 'amod'))
+        if self.random.random() < 0.8:
+            node.left.insert(0, self._node(DETERMINERS, 'DET', 'DT', 'det'))
+
+        kinds = ['adpmod']
+        if depth > 1:
+            kinds += ['rcmod', 'conj']
+
+        for i in range(self._modifier_count()):
+            if self._remaining <= 0 or depth <= 0:
+                break
+            kind = self.random.choice(kinds)
+            if kind == 'adpmod':
+                node.right.append(self._prepositional_phrase(depth))
+            elif kind == 'rcmod':
+                clause = self._clause(depth - 1, 'rcmod', subject=False)
+                clause.left.insert(0, _Node('that', 'DET', 'WDT', 'nsubj'))
+                self._remaining -= 1
+                node.right.append(clause)
+            else:
+                self._add_cc(node, ('and', 'or'))
+                node.right.append(self._noun_phrase(depth - 1, 'conj'))
+
+        return node
+
+    def _clause(self, depth, rel, subject=True):
+        node = self._node(VERBS, 'VERB', 'VBD', rel)
+        if subject:
+            node.left.append(self._noun_phrase(depth - 1, 'nsubj'))
+        if self.random.random() < 0.7:
+            node.right.append(self._noun_phrase(depth - 1, 'dobj'))
+
+        self._add_clause_modifiers(node, depth, self._modifier_count())
+        return node
+
+    def _add_clause_modifiers(self, node, depth, count):
+        kinds = ['adpmod', 'advmod']
+        if depth > 1:
+            kinds += ['ccomp', 'advcl', 'conj']
+
+        for i in range(count):
+            if self._remaining <= 0 or depth <= 0:
+                break
+            kind = self.random.choice(kinds)
+            if kind == 'adpmod':
+                node.right.append(self._prepositional_phrase(depth))
+            elif kind == 'advmod':
+                node.right.append(self._node(ADVERBS, 'ADV', 'RB', 'advmod'))
+            elif kind == 'ccomp' and not node.has_ccomp:
+                node.has_ccomp = True
+                node.right.append(self._clause(depth - 1, 'ccomp'))
+            elif kind in ('ccomp', 'advcl'):
+                marker = self._node(MARKERS, 'ADP', 'IN', 'mark')
+                clause = self._clause(depth - 1, 'advcl')
+                clause.left.insert(0, marker)
+                node.right.append(clause)
+            else:
+                self._add_cc(node, ('and', 'but'))
+                node.right.append(self._clause(depth - 1, 'conj'))
+
+    def conll_lines(self):
+        """Generate a sentence.
+
+        :returns: the CoNLL lines of the sentence.
+        """
+        self._remaining = self.length - 1
+        root = self._clause(self.depth, 'ROOT')
+        # Long sentences keep growing at the main clause.
+        while self._remaining > 0:
+            self._add_clause_modifiers(root, self.depth, 1)
+        root.right.append(_Node('.', '.', '.', 'p'))
+
+        # Number the words in order, and then write them out.
+        order = []
+
+        def visit(node, head):
+            for child in node.left:
+                visit(child, node)
+            order.append((node, head))
+            for child in node.right:
+                visit(child, node)
+
+        visit(root, None)
+        addresses = dict((id(node), i) for i, (node, _) in enumerate(order, 1))
+
+        lines = []
+        for address, (node, head) in enumerate(order, 1):
+            lines.append('\t'.join([str(address), node.word, '_', node.ctag,
+                                    node.tag, '_',
+                                    str(addresses[id(head)] if head else 0),
+                                    node.rel, '_', '_']) + '\n')
+
+        return lines
+
+    def relations(self):
+        """Generate a sentence.
+
+        :returns: the list of relations of the sentence, starting with the
+            ROOT relation.
+        """
+        return next(iter_sentences(self.conll_lines()))
+
+
+def generate(count, **kwargs):
+    """Generate several sentences.
+
+    :count: the number of sentences.
+    :kwargs: the arguments of TreeGenerator.
+    :returns: a list of relation lists.
+    """
+    generator = TreeGenerator(**kwargs)
+    return [generator.relations() for i in range(count)]
+
+
+def write_conll(path, count, **kwargs):
+    """Write several sentences to a CoNLL file.
+
+    :path: the path to the file.
+    :count: the number of sentences.
+    :kwargs: the arguments of TreeGenerator.
+    """
+    generator = TreeGenerator(**kwargs)
+    with io.open(path, 'w', encoding='utf-8') as conll_file:
+        for i in range(count):
+            conll_file.writelines(generator.conll_lines())
+            conll_file.write('\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate random dependency trees.')
+    parser.add_argument('output', help='the CoNLL file to write')
+    parser.add_argument('--sentences', type=int, default=100)
+    parser.add_argument('--length', type=int, default=20)
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--branching', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    write_conll(args.output, args.sentences, seed=args.seed,
+                length=args.length, depth=args.depth,
+                branching=args.branching)
+
+
+if __name__ == '__main__':
+    main()
@@ -17,11 +17,13 @@
 
 from __future__ import print_function, unicode_literals, division
 
+import os
 import sys
 sys.path.append('..')
 
 import idd3
-import nltk
+from idd3.base import text_type
+from idd3.conll import read_conll, iter_sentences
 
 import logging
 logging.basicConfig(level=logging.INFO)
@@ -33,16 +35,12 @@ def test():
 
     up_to_index = len(expected)
 
-    graphs = nltk.parse.dependencygraph.DependencyGraph.load('corpus.norm.conll')
+    sentences = read_conll('corpus.norm.conll')
 
     engine = idd3.Engine(idd3.rules.all_rulesets,
                          idd3.transform.all_transformations)
 
-    for i in range(up_to_index):
-        relations = []
-        for relation in graphs[i].nodelist:
-            relations.append(idd3.Relation(**relation))
-
+    for i, relations in zip(range(up_to_index), sentences):
         engine.analyze(relations)
         props = [prop.content for prop in engine.props]
 
@@ -61,5 +59,877 @@ def test():
         # Relations must have a specific kind.
         assert 'PROP' not in kinds
 
+
+def test_read_conll():
+    sentences = list(read_conll('corpus.norm.conll'))
+
+    # Sentences are separated by blank lines.
+    assert len(sentences) == 165
+
+    relations = sentences[0]
+    assert [relation.word for relation in relations] == \
+        [None, 'The', 'cat', 'ran', '.']
+    assert [relation.head for relation in relations] == [None, 2, 3, 0, 3]
+    assert relations[0].deps == [3]
+    assert relations[3].deps == [2, 4]
+
+    # Labels and tags are read as text, and are interned where Python allows.
+    assert [relation.rel for relation in relations] == \
+        ['TOP', 'det', 'nsubj', 'ROOT', 'p']
+    assert all(isinstance(relation.rel, text_type) for relation in relations)
+
+    # CoNLL-U comments, multiword tokens and empty nodes are skipped.
+    lines = ['# text = Vamos embora',
+             '1-2\tVamos\t_\t_\t_\t_\t_\t_\t_\t_',
+             '1\tVamos\tir\tVERB\tV\t_\t0\troot\t_\t_',
+             '1.1\tnós\tnós\tPRON\tP\t_\t_\t_\t1:nsubj\t_',
+             '2\tembora\tembora\tADV\tADV\t_\t1\tadvmod\t_\t_']
+    relations = next(iter_sentences(lines))
+    assert [relation.word for relation in relations] == \
+        [None, 'Vamos', 'embora']
+    assert relations[1].deps == [2]
+
+
+def test_slots():
+    from idd3 import Proposition, Relation
+
+    relation = Relation(address=1, deps=[], head=0, rel='ROOT', tag='VBD',
+                        ctag='VERB', word='ran', lemma='run', feats=None)
+    assert not hasattr(relation, '__dict__')
+    relation.processed = True
+    try:
+        relation.color = 'red'
+    except AttributeError:
+        pass
+    else:
+        assert False
+
+    # The representation doesn't show private or unset attributes.
+    assert repr(relation) == ('{address: 1, ctag: VERB, deps: [], '
+                              'feats: None, head: 0, lemma: run, '
+                              'processed: True, rel: ROOT, tag: VBD, '
+                              'word: ran}')
+
+    prop = Proposition(('ran', 'The cat'), 'P')
+    assert not hasattr(prop, '__dict__')
+    assert repr(prop) == 'ran, The cat [P]'
+
+
+def test_delete_indices():
+    import random
+    from idd3 import Relation
+    from idd3.transform import delete_indices
+
+    def delete_one_by_one(relations, indices):
+        # The original, quadratic version.
+        for index in sorted(indices, reverse=True):
+            del relations[index]
+            for rel in relations:
+                if rel.head is not None and rel.head >= index:
+                    rel.head -= 1
+
+        for i, rel in enumerate(relations):
+            rel.address = i
+            rel.deps = []
+        for i, rel in enumerate(relations):
+            if rel.head is not None:
+                relations[rel.head].deps.append(i)
+        for rel in relations:
+            rel.deps.sort()
+
+    def random_tree(generator, length):
+        heads = [None] + [generator.choice([j for j in range(length)
+                                            if j != i])
+                          for i in range(1, length)]
+        relations = [Relation(address=i, deps=[], head=head, rel='dep',
+                              tag='_', ctag='_', word=str(i), lemma=None,
+                              feats=None)
+                     for i, head in enumerate(heads)]
+        for i, head in enumerate(heads):
+            if head is not None:
+                relations[head].deps.append(i)
+        return relations
+
+    generator = random.Random(0)
+    for k in range(200):
+        seed = generator.random()
+        length = generator.randint(2, 60)
+        relations = random_tree(random.Random(seed), length)
+        expected = random_tree(random.Random(seed), length)
+
+        # Only leaves are removed, as transformations reattach the
+        #   children of the relations they remove.
+        leaves = [i for i, relation in enumerate(relations)
+                  if i and not relation.deps]
+        indices = generator.sample(leaves, generator.randint(0, len(leaves)))
+
+        delete_indices(relations, indices)
+        delete_one_by_one(expected, indices)
+        assert repr(relations) == repr(expected)
+
+
+def test_fused_transformations():
+    from idd3.rules.en import transform
+
+    sequential = read_conll('corpus.norm.conll')
+    fused = read_conll('corpus.norm.conll')
+
+    for relations, fused_relations in zip(sequential, fused):
+        for transformation in transform.all_transformations:
+            transformation.transform(relations)
+        for transformation in transform.fused_transformations:
+            transformation.transform(fused_relations)
+
+        # Fusing must not change the resulting trees.
+        assert repr(fused_relations) == repr(relations)
+
+
+def test_analyze_many():
+    engine = idd3.Engine.for_language('idd3.rules.en')
+
+    # analyze_many stops at the first sentence that fails, so only those
+    #   the rulesets can handle are used.
+    indices = []
+    expected = []
+    for i, relations in enumerate(read_conll('corpus.norm.conll')):
+        try:
+            props = engine.analyze(relations)
+        except Exception:
+            continue
+        indices.append(i)
+        expected.append([(prop.content, prop.kind) for prop in props])
+
+    sentences = list(read_conll('corpus.norm.conll'))
+    engine = idd3.Engine.for_language('idd3.rules.en')
+    results = [[(prop.content, prop.kind) for prop in props]
+               for props in engine.analyze_many(sentences[i]
+                                                for i in indices)]
+    assert results == expected
+
+    # The dispatch table is kept across sentences, and only rebuilt when
+    #   the rulesets change.
+    relations = sentences[indices[0]]
+    table = engine._rulesets_dict
+    assert engine._build_rulesets_dict(relations) is table
+    engine.rulesets = engine.rulesets[1:]
+    table = engine._build_rulesets_dict(relations)
+    assert table['TOP'] is None and table['nsubj'] is not None
+
+
+def test_parallel_analyzer():
+    from idd3.parallel import ParallelAnalyzer
+    from idd3.rules import en
+
+    engine = idd3.Engine.for_language(en)
+    expected = []
+    for relations in read_conll('corpus.norm.conll'):
+        try:
+            props = engine.analyze(relations)
+        except Exception:
+            # Workers return no propositions for sentences that fail.
+            props = []
+        expected.append([(prop.content, prop.kind) for prop in props])
+    assert [] in expected
+
+    with ParallelAnalyzer(en, processes=2, batch_size=7) as analyzer:
+        results = [[(prop.content, prop.kind) for prop in props]
+                   for props in analyzer.analyze(
+                       read_conll('corpus.norm.conll'))]
+
+    assert results == expected
+    assert analyzer.language == 'idd3.rules.en'
+    assert sum(analyzer.stats.values()) == \
+        sum(len(props) for props in expected)
+
+
+def test_analysis_cache():
+    from idd3.cache import AnalysisCache
+    from idd3.rules import en
+
+    idd3.use_language(en)
+    engine = idd3.Engine(idd3.all_rulesets, idd3.all_transformations)
+    cached_engine = idd3.Engine(idd3.all_rulesets, idd3.all_transformations,
+                                cache=AnalysisCache(maxsize=100))
+
+    sentences = list(read_conll('corpus.norm.conll'))
+    first_pass = read_conll('corpus.norm.conll')
+    second_pass = read_conll('corpus.norm.conll')
+
+    analyzed = 0
+    for relations, first, second in zip(sentences, first_pass, second_pass):
+        try:
+            engine.analyze(relations)
+        except Exception:
+            # Some sentences are still beyond the rulesets.
+            continue
+        analyzed += 1
+
+        cached_engine.analyze(first)
+        cached_engine.analyze(second)
+
+        # Cached results must be indistinguishable from fresh ones.
+        props = [(prop.content, prop.kind) for prop in engine.props]
+        assert [(prop.content, prop.kind)
+                for prop in cached_engine.props] == props
+        assert repr(second) == repr(relations)
+
+    stats = cached_engine.cache.stats()
+    assert stats['size'] == 100
+    # The corpus has a few repeated sentences, which also hit on the first
+    #   pass.
+    assert stats['hits'] + stats['misses'] == 2 * analyzed
+    assert stats['hits'] > analyzed
+
+
+def test_threaded_engine():
+    from multiprocessing.pool import ThreadPool
+    from idd3.rules import en
+
+    idd3.use_language(en)
+    engine = idd3.Engine(idd3.all_rulesets, idd3.all_transformations)
+
+    def analyze(relations):
+        try:
+            return [(prop.content, prop.kind)
+                    for prop in engine.analyze(relations)]
+        except Exception:
+            return None
+
+    expected = [analyze(relations)
+                for relations in read_conll('corpus.norm.conll')]
+
+    # A single engine serves all the threads.
+    pool = ThreadPool(8)
+    try:
+        results = pool.map(analyze, read_conll('corpus.norm.conll'),
+                           chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+    assert results == expected
+
+
+def test_language_packs():
+    import pickle
+    from multiprocessing.pool import ThreadPool
+    from idd3.rules import en, pt
+
+    def analyze(engine, relations):
+        try:
+            return [(prop.content, prop.kind)
+                    for prop in engine.analyze(relations)]
+        except Exception:
+            return None
+
+    expected = {}
+    for language in (en, pt):
+        idd3.use_language(language)
+        engine = idd3.Engine(idd3.all_rulesets, idd3.all_transformations)
+        expected[language.__name__] = [
+            analyze(engine, relations)
+            for relations in read_conll('corpus.norm.conll')]
+
+    # Both languages run at once, whatever the global configuration is.
+    engines = [idd3.Engine.for_language(name) for name in sorted(expected)]
+    # Transformations change the relations in place, so each engine reads
+    #   its own copy of the corpus.
+    jobs = [(engine, relations)
+            for sentences in zip(*[read_conll('corpus.norm.conll')
+                                   for engine in engines])
+            for engine, relations in zip(engines, sentences)]
+    pool = ThreadPool(4)
+    try:
+        results = pool.map(lambda job: analyze(*job), jobs, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+    for i, engine in enumerate(engines):
+        assert results[i::2] == expected[engine.language.name]
+
+    # The dispatch table of a pack agrees with the engines.
+    for engine in engines:
+        for rel, ruleset in engine.language.dispatch.items():
+            assert engine._find_ruleset(rel) is ruleset
+
+    class AnyRuleset(idd3.Ruleset):
+        rel = 'any'
+
+        def applies(self, rel):
+            return True
+
+    class NsubjRuleset(idd3.Ruleset):
+        rel = 'nsubj'
+
+    rulesets = [AnyRuleset(), NsubjRuleset()]
+    pack = idd3.LanguagePack('test', {}, [], rulesets)
+    assert pack.dispatch == {'any': rulesets[0], 'nsubj': rulesets[0]}
+
+    pack = engines[0].language
+    assert pickle.loads(pickle.dumps(pack)).config == pack.config
+    assert sorted(pickle.loads(pickle.dumps(pack)).dispatch) == \
+        sorted(pack.dispatch)
+    try:
+        pack.config['GERUND_TAGS'] = ()
+    except TypeError:
+        pass
+    else:
+        assert False
+
+
+def test_config_from_object():
+    from idd3.rules import en
+
+    config = idd3.Config()
+    config.from_object('idd3.rules.en')
+
+    # Sequences become frozensets, since they're only used in membership
+    #   tests; other parameters are kept as they are.
+    assert isinstance(en.NON_EMITTED_DETS, tuple)
+    assert config['NON_EMITTED_DETS'] == frozenset(en.NON_EMITTED_DETS)
+    assert config['GERUND_TAGS'] == en.GERUND_TAGS
+    assert 'config' not in config
+
+
+def test_count_only():
+    from collections import Counter
+
+    for language in ('idd3.rules.en', 'idd3.rules.pt'):
+        engine = idd3.Engine.for_language(language)
+        counting_engine = idd3.Engine.for_language(language, count_only=True)
+
+        for relations, copy in zip(read_conll('corpus.norm.conll'),
+                                   read_conll('corpus.norm.conll')):
+            try:
+                props = engine.analyze(relations)
+            except Exception:
+                continue
+
+            counts = counting_engine.analyze(copy)
+            assert counts == Counter(prop.kind for prop in props)
+
+
+def test_sinks():
+    import io
+    import json
+    from collections import Counter
+    from idd3.cache import AnalysisCache
+    from idd3.sinks import (BufferSink, CallbackSink, CountingSink,
+                            FileSink, TeeSink)
+
+    counting = CountingSink()
+    buffered = BufferSink(maxlen=5)
+    output = io.StringIO()
+    received = []
+    sink = TeeSink(counting, buffered, FileSink(output),
+                   CallbackSink(lambda sentence_id, prop:
+                                received.append(sentence_id)))
+    engine = idd3.Engine.for_language('idd3.rules.en', sink=sink,
+                                      cache=AnalysisCache())
+
+    kinds = Counter()
+    sentences = list(read_conll('corpus.norm.conll'))[:20]
+    # The second pass comes from the cache.
+    for relations in sentences + list(read_conll('corpus.norm.conll'))[:20]:
+        kinds.update(prop.kind for prop in engine.analyze(relations))
+
+    assert counting.counts == kinds
+    assert counting.sentences == 40
+    assert received == sorted(received)
+    assert len(buffered.drain()) == 5 and not buffered.buffer
+
+    lines = output.getvalue().splitlines()
+    assert len(lines) == sum(kinds.values())
+    assert json.loads(lines[0])['sentence'] == 0
+
+
+def test_failed_sentences():
+    import io
+    import json
+    from idd3.sinks import CountingSink, FileSink, TeeSink
+
+    counting = CountingSink()
+    output = io.StringIO()
+    engine = idd3.Engine.for_language(
+        'idd3.rules.en', sink=TeeSink(counting, FileSink(output)))
+
+    # Some sentences of the corpus make the rulesets fail, after emitting
+    #   some of their propositions.
+    total = failed = 0
+    for relations in read_conll('corpus.norm.conll'):
+        try:
+            total += len(engine.analyze(relations))
+        except Exception:
+            failed += 1
+
+    assert failed > 0
+    assert counting.total == total
+    assert counting.sentences + counting.failed == 165
+    assert counting.failed == failed
+
+    errors = [record for record in map(json.loads,
+                                       output.getvalue().splitlines())
+              if 'error' in record]
+    assert len(errors) == failed
+
+
+def test_count_only_replay():
+    from idd3.cache import AnalysisCache
+    from idd3.sinks import CallbackSink
+
+    events = []
+    sink = CallbackSink(lambda sentence_id, prop:
+                        events.append((sentence_id, prop.kind, prop.index)))
+    engine = idd3.Engine.for_language('idd3.rules.en', sink=sink,
+                                      cache=AnalysisCache(), count_only=True)
+
+    sentences = list(read_conll('corpus.norm.conll'))[:20]
+    for relations in sentences:
+        engine.analyze(relations)
+    fresh = [event[1:] for event in events]
+
+    # A cached result is replayed in the order it was emitted.
+    del events[:]
+    for relations in list(read_conll('corpus.norm.conll'))[:20]:
+        engine.analyze(relations)
+    assert [event[1:] for event in events] == fresh
+    assert all(index is not None for kind, index in fresh)
+
+
+def test_proposition_indices():
+    engine = idd3.Engine.for_language('idd3.rules.en')
+
+    for relations in read_conll('corpus.norm.conll'):
+        try:
+            props = engine.analyze(relations)
+        except Exception:
+            continue
+
+        for prop in props:
+            assert 0 < prop.index < len(relations)
+            assert repr(prop).endswith(' [{0}]'.format(prop.kind))
+
+    # The cat ran: the proposition is emitted by the ruleset of the verb.
+    relations = list(read_conll('corpus.norm.conll'))[0]
+    props = engine.analyze(relations)
+    assert relations[props[0].index].word == 'ran'
+
+
+def test_deep_engine():
+    from idd3.rules import en
+
+    # I think (that) I think (that) ... I think, with every clause nested in
+    #   the previous one.
+    depth = 2000
+    lines = []
+    for k in range(depth):
+        subj, verb = 2 * k + 1, 2 * k + 2
+        lines.append('{0}\tI\t_\tPRON\tPRP\t_\t{1}\tnsubj\t_\t_'
+                     .format(subj, verb))
+        lines.append('{0}\tthink\t_\tVERB\tVBP\t_\t{1}\t{2}\t_\t_'
+                     .format(verb, verb - 2 if k else 0,
+                             'ccomp' if k else 'ROOT'))
+    relations = next(iter_sentences(lines))
+    assert idd3.Engine.tree_depth(relations) == depth + 1
+
+    idd3.use_language(en)
+    engine = idd3.Engine(idd3.all_rulesets, idd3.all_transformations,
+                         deep=True)
+    limit = sys.getrecursionlimit()
+    engine.analyze(relations)
+
+    assert len(engine.props) == depth
+    assert engine.get_unprocessed_relations(relations) == []
+    # The recursion limit is only raised during the analysis.
+    assert sys.getrecursionlimit() == limit
+
+
+def test_children_index():
+    from idd3 import Relation
+
+    engine = idd3.Engine.for_language('idd3.rules.en')
+    # The cat ran .
+    relations = list(read_conll('corpus.norm.conll'))[0]
+    engine.analyze(relations)
+    assert Relation.get_children_with_dep('nsubj', relations, 3) == [2]
+
+    # Changing the tree after the analysis doesn't leave a stale index.
+    relations[2].head = 1
+    assert Relation.get_children_with_dep('nsubj', relations, 3) == []
+
+    Relation.build_children_index(relations)
+    assert Relation.get_children_with_dep('det', relations, 2) == [1]
+    Relation.clear_children_index(relations)
+    relations[1].rel = 'amod'
+    assert Relation.get_children_with_dep('det', relations, 2) == []
+
+
+def test_context():
+    root = idd3.Context()
+    context = root.descend(0).descend(3).descend(5)
+
+    # Descending shares the parent's path instead of copying it.
+    assert context.parent.parent.parent is root
+    assert len(context) == 3
+    assert context[-1] == 5 and context[0] == 0 and context[-2] == 3
+    assert context.path() == [0, 3, 5]
+    assert context + [7] == [0, 3, 5, 7]
+    assert idd3.Context.from_path([0, 3, 5]) == context
+    assert len(root) == 0 and not root
+
+
+def test_profiler():
+    import json
+    import tempfile
+    from idd3.profiling import Profiler
+    from idd3.rules import en
+
+    idd3.use_language(en)
+    profiler = Profiler()
+    engine = idd3.Engine(idd3.all_rulesets, idd3.all_transformations,
+                         profiler=profiler)
+
+    sentences = list(read_conll('corpus.norm.conll'))[:20]
+    for relations in sentences:
+        engine.analyze(relations)
+
+    timings = profiler.to_dict()
+    assert timings['rulesets']['TopRuleset']['calls'] == len(sentences)
+    for name, stats in timings['rulesets'].items():
+        assert 0 <= stats['self'] <= stats['cumulative']
+    assert [timings['transformations'][t.__class__.__name__]['calls']
+            for t in idd3.all_transformations] == \
+        [len(sentences)] * len(idd3.all_transformations)
+
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+        path = f.name
+    try:
+        profiler.write_json(path)
+        with open(path) as json_file:
+            assert json.load(json_file) == json.loads(json.dumps(timings))
+
+        profiler.write_collapsed(path)
+        with open(path) as collapsed_file:
+            stacks = [line.rsplit(' ', 1)[0] for line in collapsed_file]
+        assert 'analyze;TopRuleset;RootRuleset;NsubjRuleset' in stacks
+    finally:
+        os.remove(path)
+
+
+def test_synthetic_trees():
+    from idd3.rules import en
+    from synthetic import TreeGenerator, generate
+
+    # The same seed gives the same trees.
+    assert TreeGenerator(seed=7).conll_lines() == \
+        TreeGenerator(seed=7).conll_lines()
+
+    idd3.use_language(en)
+    engine = idd3.Engine(idd3.all_rulesets, idd3.all_transformations)
+    for relations in generate(20, seed=1, length=60, depth=4, branching=3):
+        assert len(relations) - 1 >= 60
+        assert idd3.Engine.tree_depth(relations) <= 3 * 4 + 2
+
+        # The rulesets understand every relation.
+        engine.analyze(relations)
+        assert engine.get_unprocessed_relations(relations) == []
+
+
+def test_tracer():
+    import io
+    import json
+    from idd3.tracing import Tracer
+    from idd3.rules import en
+
+    idd3.use_language(en)
+    output = io.StringIO()
+    engine = idd3.Engine(idd3.all_rulesets, idd3.all_transformations,
+                         tracer=Tracer(output, sentence_ids=[0, 2]))
+    for relations in list(read_conll('corpus.norm.conll'))[:3]:
+        engine.analyze(relations)
+
+    traces = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [trace['sentence'] for trace in traces] == [0, 2]
+
+    # The cat ran .
+    trace = traces[0]
+    assert [row[1] for row in trace['tree']] == [None, 'The', 'cat', 'ran']
+    assert [call[2] for call in trace['dispatch']] == \
+        ['TopRuleset', 'RootRuleset', 'NsubjRuleset', 'DetRuleset']
+    assert trace['propositions'] == [[['ran', 'The cat'], 'P', 3]]
+
+
+def test_columnar_sentences():
+    from idd3.columnar import ColumnarSentence, Vocabulary
+    from idd3.transform import RemovePunctuation
+
+    with open('corpus.norm.conll') as corpus:
+        blocks = corpus.read().strip().split('\n\n')
+
+    vocabulary = Vocabulary()
+    for block, relations in zip(blocks, read_conll('corpus.norm.conll')):
+        sentence = ColumnarSentence.from_conll(block.split('\n'), vocabulary)
+        assert repr(sentence.to_relations()) == repr(relations)
+        assert [view.deps for view in sentence] == \
+            [relation.deps for relation in relations]
+
+        # Serialized sentences don't depend on the vocabulary.
+        copy = ColumnarSentence.from_bytes(sentence.to_bytes(), Vocabulary())
+        assert repr(copy.to_relations()) == repr(relations)
+
+        sentence.remove_punctuation()
+        RemovePunctuation().transform(relations)
+        assert repr(sentence.to_relations()) == repr(relations)
+
+
+def test_columnar_engine():
+    import random
+    from idd3.columnar import ColumnarSentence, Vocabulary
+    from idd3.transform import delete_indices
+
+    with open('corpus.norm.conll') as corpus:
+        blocks = corpus.read().strip().split('\n\n')
+
+    engine = idd3.Engine.for_language('idd3.rules.en')
+    vocabulary = Vocabulary()
+    for block, relations in zip(blocks, read_conll('corpus.norm.conll')):
+        sentence = ColumnarSentence.from_conll(block.split('\n'), vocabulary)
+
+        # Views work with the children index, like Relations.
+        views = list(sentence)
+        for index, relation in enumerate(relations):
+            for rel in ('nsubj', 'dobj', 'det', 'p'):
+                assert idd3.Relation.get_children_with_dep(
+                    rel, views, index) == \
+                    idd3.Relation.get_children_with_dep(rel, relations, index)
+        relations[1].processed = False
+        assert repr(views[1]) == repr(relations[1])
+
+        views[1].processed = True
+        assert sentence[1].processed and not sentence[2].processed
+
+        try:
+            expected = repr(engine.analyze(relations))
+        except Exception:
+            continue
+        assert repr(engine.analyze(sentence)) == expected
+
+    # Deleting relations gives the same heads as delete_indices.
+    generator = random.Random(0)
+    for i in range(100):
+        relations = next(iter_sentences(
+            '{0}\tw\t_\tX\tX\t_\t{1}\tdep\t_\t_'.format(
+                index, generator.randrange(index)) for index in range(1, 20)))
+        sentence = ColumnarSentence.from_relations(relations, vocabulary)
+        indices = generator.sample(range(1, len(relations)), 5)
+        delete_indices(relations, indices)
+        sentence.delete(indices)
+        assert [view.head for view in sentence] == \
+            [relation.head for relation in relations]
+
+
+def test_parser_pool():
+    from idd3.parsers import ParserWorker, ParserPool
+
+    command = [sys.executable, 'stub_parser.py']
+
+    worker = ParserWorker(command)
+    worker.start()
+    lines = worker.parse('The cat ran')
+    assert worker.parse('') == []
+    worker.stop()
+
+    assert [line.split('\t')[1] for line in lines] == ['The', 'cat', 'ran']
+
+    pool = ParserPool(command, size=3)
+    parses = pool.parse_many(['Sentence %d here' % i for i in range(20)])
+    pool.close()
+
+    # Parses come back in the same order as the sentences.
+    assert [lines[1].split('\t')[1] for lines in parses] == \
+        [str(i) for i in range(20)]
+
+    # A worker whose parse fails is stopped, and started again by the next
+    #   parse that gets it, even if starting it failed before.
+    pool = ParserPool(command, size=1)
+    worker = pool._workers.queue[0]
+    worker.process.kill()
+    worker.process.wait()
+    worker.command = [os.path.join('missing', 'parser')]
+    for error in (IOError, OSError):
+        try:
+            pool.parse('The cat ran')
+        except error:
+            pass
+        else:
+            assert False
+        assert worker.process is None
+    worker.command = command
+    assert [line.split('\t')[1] for line in pool.parse('The cat ran')] == \
+        ['The', 'cat', 'ran']
+    pool.close()
+
+
+def test_stanford_parser_workers():
+    import tempfile
+    from idd3.parsers import StanfordParser
+
+    with tempfile.NamedTemporaryFile('w', suffix='.map', delete=False) as f:
+        f.write('NN\tNOUN\n')
+    parser = StanfordParser('stanford', f.name)
+    os.remove(f.name)
+
+    # StanfordParser has no worker mode.
+    try:
+        parser.start_workers(2)
+    except NotImplementedError as error:
+        assert 'worker mode' in str(error)
+    else:
+        assert False
+    assert parser.pool is None
+
+
+def test_parse_raw_file_with_workers():
+    import tempfile
+    from idd3.parsers import StanfordUnivDepParser
+
+    with tempfile.NamedTemporaryFile('w', suffix='.map', delete=False) as f:
+        f.write('NN\tNOUN\n')
+    parser = StanfordUnivDepParser('corenlp', 'model', f.name)
+    os.remove(f.name)
+
+    parser.start_workers(2, [sys.executable, 'stub_parser.py'])
+    sentences = list(parser.iter_parse_raw_file('corpus.txt'))
+    parser.stop_workers()
+
+    with open('corpus.txt') as corpus:
+        lines = corpus.readlines()
+
+    assert len(sentences) == len(lines)
+    for relations, line in zip(sentences, lines):
+        assert [r.word for r in relations[1:]] == line.split()
+        assert relations[1].rel == 'ROOT'
+        assert relations[1].ctag == 'NOUN'
+        assert relations[1].tag == 'NN'
+        assert relations[1].feats == 'O'
+
+
+def test_parse_cache():
+    import shutil
+    import tempfile
+    from idd3.cache import ParseCache
+    from idd3.parsers import StanfordUnivDepParser
+
+    directory = tempfile.mkdtemp()
+    with tempfile.NamedTemporaryFile('w', suffix='.map', delete=False) as f:
+        f.write('NN\tNOUN\n')
+    parser = StanfordUnivDepParser('corenlp', 'model', f.name,
+                                   cache=ParseCache(directory))
+    os.remove(f.name)
+
+    try:
+        parser.start_workers(2, [sys.executable, 'stub_parser.py'])
+        parsed = [[r.word for r in relations]
+                  for relations in parser.iter_parse_raw_file('corpus.txt')]
+        parser.stop_workers()
+
+        # Every sentence is in the cache now, so no parser is started.
+        cached = [[r.word for r in relations]
+                  for relations in parser.iter_parse_raw_file('corpus.txt')]
+
+        assert cached == parsed
+        stats = parser.cache.stats()
+        assert stats['hits'] == stats['misses'] == len(parsed)
+        assert stats['hit_rate'] == 0.5
+
+        # Shrinking the cache evicts the least recently used trees.
+        cache = ParseCache(directory, max_bytes=stats['size'] // 2)
+        cache.evict()
+        assert 0 < cache.size <= stats['size'] // 2
+    finally:
+        shutil.rmtree(directory)
+
+
+def _stub_dependency_parser(cache=None, shell=False):
+    from idd3.parsers import DependencyParser
+
+    class StubParser(DependencyParser):
+
+        pos_mapping = {}
+        worker_prompt = 'NLP> '
+        worker_commands = ('q', 'quit', 'exit')
+
+        def worker_command(self):
+            return [sys.executable, 'stub_parser.py'] + \
+                (['--shell'] if shell else [])
+
+        def normalize_lines(self, lines):
+            for line in lines:
+                yield line
+
+    parser = StubParser()
+    parser.cache = cache
+    return parser
+
+
+def test_parser_worker_shell():
+    import tempfile
+
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+        f.write('The cat ran\nquit\nThe dog barked\n')
+
+    try:
+        expected = list(_stub_dependency_parser().normalized_lines(f.name))
+
+        # The prompts are removed, and 'quit' is parsed rather than taken
+        #   as a command, both by run_parser and by the workers.
+        parser = _stub_dependency_parser(shell=True)
+        assert list(parser.normalized_lines(f.name)) == expected
+
+        parser.start_workers(2)
+        try:
+            assert list(parser.normalized_lines(f.name)) == expected
+        finally:
+            parser.stop_workers()
+    finally:
+        os.remove(f.name)
+
+    assert [line.split('\t')[1] for line in expected
+            if not line.isspace()] == \
+        ['The', 'cat', 'ran', 'quit', 'The', 'dog', 'barked']
+
+
+def test_parse_cache_without_workers():
+    import shutil
+    import tempfile
+    from idd3.cache import ParseCache
+
+    directory = tempfile.mkdtemp()
+    try:
+        expected = list(_stub_dependency_parser().normalized_lines(
+            'corpus.txt'))
+
+        # Without workers, the cache stores what run_parser writes.
+        parser = _stub_dependency_parser(ParseCache(directory))
+        assert list(parser.normalized_lines('corpus.txt')) == expected
+        assert list(parser.normalized_lines('corpus.txt')) == expected
+        stats = parser.cache.stats()
+        assert stats['hits'] == stats['misses']
+
+        # A corrupt entry is a miss, and is parsed again.
+        with open('corpus.txt') as corpus:
+            sentence = corpus.readline()
+        key = parser.cache.key(parser.parser_id(), sentence)
+        with open(parser.cache._path(key), 'wb') as entry:
+            entry.write(b'not zlib')
+
+        assert parser.cache.get(key) is None
+        assert list(parser.normalized_lines('corpus.txt')) == expected
+        assert parser.cache.get(key) is not None
+    finally:
+        shutil.rmtree(directory)
+
+
 if __name__ == '__main__':
     test()